@@ -1,6 +1,11 @@
 from .animation_manager import AnimationGifHandler
+from .chat_stream_buffer import ChatStreamBuffer
 from .chatbot_handler import ChatbotHandler
+from .conversation_store import ConversationStore
+from .event_manager import EventManager
+from .file_tracker import FileChangeTracker
 from .gui_manager import GUIManager
+from .ollama_client import OllamaClient
 from .read_write_manager import ReadWriteManager
 from .settings_manager import load_settings, save_settings
 from .settings_menu import SettingsMenu
@@ -11,8 +16,13 @@ from .ASCII_Face import FRAMES_BY_STATE
 # Export these names for easy access
 __all__ = [
     'AnimationGifHandler',
+    'ChatStreamBuffer',
     'ChatbotHandler',
+    'ConversationStore',
+    'EventManager',
+    'FileChangeTracker',
     'GUIManager',
+    'OllamaClient',
     'ReadWriteManager',
     'load_settings',
     'save_settings',
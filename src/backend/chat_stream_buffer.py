@@ -0,0 +1,97 @@
+import time
+from collections import deque
+
+MIN_FLUSH_INTERVAL_MS = 16
+MAX_FLUSH_INTERVAL_MS = 100
+RENDER_BUDGET = 0.25
+SMOOTHING = 0.3
+
+class ChatStreamBuffer:
+    """Collects streamed chat text and renders it once per frame.
+
+    Writes come from the Tk thread (worker threads reach it through
+    MAIN_THREAD events) and only append to a deque. The first write after
+    an idle spell schedules a frame, which drains everything written since
+    into a single render call; frames stop once one finds nothing to draw,
+    so the loop costs nothing between replies. The frame interval stretches
+    when rendering gets expensive so that at most RENDER_BUDGET of the UI
+    thread is spent on it.
+    """
+
+    def __init__(self, root, render, min_interval_ms=MIN_FLUSH_INTERVAL_MS,
+                 max_interval_ms=MAX_FLUSH_INTERVAL_MS):
+        self.root = root
+        self.render = render
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.interval_ms = min_interval_ms
+        self.after_id = None
+        self.running = False
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+        self._pending = deque()
+
+    def write(self, text, tag=None):
+        """Queue text for the next frame, scheduling one if none is pending"""
+        self._pending.append((text, tag))
+        self._schedule()
+
+    def start(self):
+        self.running = True
+        if self._pending:
+            self._schedule()
+
+    def stop(self):
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except Exception:
+                pass
+            self.after_id = None
+
+    def discard(self):
+        """Drop text that has not been rendered yet"""
+        self._pending.clear()
+
+    def flush(self):
+        """Render everything queued so far, returning True if anything was drawn"""
+        segments = []
+        while True:
+            try:
+                text, tag = self._pending.popleft()
+            except IndexError:
+                break
+            if segments and segments[-1][1] == tag:
+                segments[-1][0].append(text)
+            else:
+                segments.append(([text], tag))
+        if not segments:
+            return False
+
+        started = time.perf_counter()
+        self.render([("".join(parts), tag) for parts, tag in segments])
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        self.flush_count += 1
+        self._adapt_interval()
+        return True
+
+    def _adapt_interval(self):
+        target = self.last_flush_ms / RENDER_BUDGET
+        target = max(self.min_interval_ms, min(self.max_interval_ms, target))
+        self.interval_ms = int(self.interval_ms + (target - self.interval_ms) * SMOOTHING)
+
+    def _schedule(self):
+        if self.running and self.after_id is None:
+            self.after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self.after_id = None
+        try:
+            flushed = self.flush()
+        except Exception as e:
+            print(f"Error flushing chat stream: {e}")
+            flushed = False
+        # Keep drawing while text arrives; the next write wakes an idle loop
+        if flushed:
+            self._schedule()
@@ -1,23 +1,117 @@
 import requests
 import json
+import re
 import threading
-import subprocess
-from collections import deque
+import time
+import psutil
 from pathlib import Path
 from .animation_manager import AnimationGifHandler
+from .conversation_compactor import ConversationCompactor, COMPACTION_IDLE_SECONDS
+from .document_summarizer import (
+    DocumentSummarizer, SUMMARIZE_COMMAND, SUMMARY_CHUNK_TOKENS, SUMMARY_PARALLEL, SUMMARY_CACHE_PATH
+)
+from .file_tracker import SCAN_INTERVAL_SECONDS
+from .model_lifecycle import ModelLifecycle, IDLE_UNLOAD_SECONDS
+from .ollama_client import OllamaClient
+from .read_write_manager import ReadWriteManager
+from .response_cache import ResponseCache, make_cache_key, CACHE_PATH
+from .retrieval_index import RetrievalIndex, INDEX_PATH, TOP_K, CONTEXT_TOKENS
+from .vector_store import VectorStore, VECTOR_STORE_DIR, EMBEDDING_MODEL, EMBED_CONCURRENCY
 from .settings_manager import load_settings, save_settings
+from .token_budget import ConversationBudget, DEFAULT_RESPONSE_RESERVE, MESSAGE_OVERHEAD_TOKENS, estimate_tokens
 
-OLLAMA_API_BASE = "http://localhost:11434/api"
 DEFAULT_PERSONALITY = "conversational"
+CANCELLED_MARKER = " [stopped]"
+PERSONALITY_FACES = {"analytical": "ANALYSIS", "conversational": "CHATTING"}
+PERSONALITY_FACE_SECONDS = 4.0
+STANDBY_HEADROOM_MB = 1024
+MODEL_MEMORY_FACTOR = 1.2
+MODEL_LOAD_TIMEOUT_SECONDS = 300
+REPLAY_PIECE = re.compile(r"\S+\s*|\s+")
+
+class GenerationHandle:
+    """Tracks one streaming reply so it can be cancelled from the GUI"""
+
+    def __init__(self, previous=None):
+        self.previous = previous
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self._responses = set()
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self):
+        return not self.done.is_set()
+
+    def attach(self, response):
+        """Remember an HTTP stream, closing it at once if already cancelled"""
+        with self._lock:
+            self._responses.add(response)
+            if self.cancelled.is_set():
+                self._close_responses()
+
+    def detach(self, response):
+        """Forget a stream that has finished on its own"""
+        with self._lock:
+            self._responses.discard(response)
+
+    def cancel(self):
+        """Stop the generation by closing its HTTP streams"""
+        with self._lock:
+            self.cancelled.set()
+            self._close_responses()
+
+    def _close_responses(self):
+        # Dropping the connection is what makes Ollama stop computing tokens
+        for response in self._responses:
+            try:
+                response.close()
+            except Exception as e:
+                print(f"Error closing response stream: {e}")
 
 class ChatbotHandler:
-    def __init__(self, event_manager, animation_manager: AnimationGifHandler):
+    def __init__(self, event_manager, animation_manager: AnimationGifHandler = None, client=None, settings=None,
+                 personalities_path=None):
         self.event_manager = event_manager
         self.animation_manager = animation_manager
-        self.personalities_path = Path(__file__).parent.parent / "personalities/ai_config.json"
+        self.client = client or OllamaClient()
+        self.current_generation = None
+        self._switch_generation = 0
+        # The compactor thread edits the history and context alongside the stream thread
+        self._history_lock = threading.RLock()
+        self._context_epoch = 0
+        self.personalities_path = personalities_path or Path(__file__).parent.parent / "personalities/ai_config.json"
         self.personalities = self._load_personalities()
         
-        settings = load_settings()
+        # Tools pass their own settings so they never touch the app's files
+        settings = load_settings() if settings is None else settings
+        self.lifecycle = ModelLifecycle(
+            self.client,
+            event_manager,
+            idle_unload_seconds=settings.get("model_idle_unload_seconds", IDLE_UNLOAD_SECONDS)
+        )
+        self.compactor = ConversationCompactor(
+            self.client,
+            model_name=None,
+            is_idle=lambda: not self.is_generating,
+            idle_seconds=settings.get("compaction_idle_seconds", COMPACTION_IDLE_SECONDS),
+            on_summary=self._on_compacted,
+            lifecycle=self.lifecycle
+        )
+        self.response_cache = self._open_cache(settings, "response_cache", CACHE_PATH)
+        # Summary steps have a store of their own, so turning off reply caching keeps summary reuse
+        self.summary_cache = self._open_cache(settings, "summary_cache", SUMMARY_CACHE_PATH)
+        self.files = ReadWriteManager(settings.get("ai_files_dir", "ai_files"))
+        self.retriever = self._open_retriever(settings)
+        self.summarizer = DocumentSummarizer(
+            self.client,
+            self.files,
+            cache=self.summary_cache,
+            parallel=settings.get("summary_parallel", SUMMARY_PARALLEL)
+        )
+        self.summary_chunk_tokens = settings.get("summary_chunk_tokens", SUMMARY_CHUNK_TOKENS)
+        self.retrieval_top_k = settings.get("retrieval_top_k", TOP_K)
+        self.retrieval_tokens = settings.get("retrieval_token_budget", CONTEXT_TOKENS)
         self.current_personality = settings.get("personality", DEFAULT_PERSONALITY)
         self._configure_personality()
         
@@ -30,14 +124,16 @@ class ChatbotHandler:
                 "ai_name": "Pip-Pi",
                 "system_prompt": "Your name is Pip-Pi, an assistant who is a no-nonsense, very competent AI. You are to prioritize being concise when the question being asked calls for no nonsense. Avoid small talk and banter and instead try to answer the user in as clear of a way as you can. Maintain a helpful, calm, happy demeanor.",
                 "max_tokens": 8000,
-                "approx_tokens_per_message": 200
+                "num_ctx": 8192,
+                "response_reserve_tokens": 1024
             },
             "analytical": {
                 "model_name": "deepseek-r1:7b",
                 "ai_name": "Pip-Pi",
                 "system_prompt": "Your name is Pip-Pi, and you are a highly analytical AI assistant focused on detailed analysis and logical problem-solving. Prioritize accuracy and depth in your responses. Provide thorough explanations with supporting evidence when applicable. Break down complex problems into clear steps.",
                 "max_tokens": 8000,
-                "approx_tokens_per_message": 200
+                "num_ctx": 8192,
+                "response_reserve_tokens": 2048
             }
         }
         
@@ -48,77 +144,437 @@ class ChatbotHandler:
             print(f"Error loading personalities from {self.personalities_path}: {e}")
             return default_config
 
+    def _open_cache(self, settings, key, default_path):
+        """Open the ResponseCache enabled by settings[key] at settings[key + "_path"]"""
+        if not settings.get(key, True):
+            return None
+        try:
+            return ResponseCache(settings.get(f"{key}_path", default_path))
+        except Exception as e:
+            print(f"Error opening {key.replace('_', ' ')}: {e}")
+            return None
+
+    def _open_retriever(self, settings):
+        if not settings.get("retrieval_enabled", False):
+            return None
+        try:
+            if settings.get("retrieval_backend", "bm25") == "embeddings":
+                retriever = VectorStore(
+                    self.client,
+                    manager=self.files,
+                    directory=settings.get("vector_store_dir", VECTOR_STORE_DIR),
+                    model=settings.get("embedding_model", EMBEDDING_MODEL),
+                    concurrency=settings.get("embedding_concurrency", EMBED_CONCURRENCY)
+                )
+            else:
+                retriever = RetrievalIndex(self.files, path=settings.get("retrieval_index_path", INDEX_PATH))
+        except Exception as e:
+            print(f"Error opening retrieval index: {e}")
+            return None
+        # Catch up with edits made while the app was closed, then follow
+        # the folder's change events file by file
+        retriever.refresh_async()
+        self.event_manager.subscribe("AI_FILES_CHANGED", retriever.apply_changes, self.event_manager.WORKER)
+        self.files.watch(self.event_manager, settings.get("ai_files_scan_seconds", SCAN_INTERVAL_SECONDS))
+        return retriever
+
     def _configure_personality(self):
         config = self.personalities[self.current_personality]
         self.model_name = config["model_name"]
         self.ai_name = config["ai_name"]
         self.base_system_prompt = config["system_prompt"]
         self.max_tokens = config["max_tokens"]
-        self.approx_tokens_per_message = config["approx_tokens_per_message"]
-        self.conversation_history = deque(maxlen=(self.max_tokens // self.approx_tokens_per_message))
+        self.num_ctx = config.get("num_ctx", self.max_tokens)
+        self.reuse_context = config.get("reuse_context", True)
+        self.compaction_enabled = config.get("compaction", True)
+        self.cache_ttl = config.get("cache_ttl_seconds", 0)
+        self.compactor.reset(self.model_name, options=self.model_options)
+        self.conversation_history = ConversationBudget(
+            self.num_ctx,
+            reserve_tokens=config.get("response_reserve_tokens", DEFAULT_RESPONSE_RESERVE)
+        )
+        self._update_prompt_budget()
+        self.reset_context()
+
+    def _update_prompt_budget(self):
+        with self._history_lock:
+            trimmed = self.conversation_history.set_prompt_tokens(
+                estimate_tokens(self.build_system_prompt()) + MESSAGE_OVERHEAD_TOKENS
+            )
+            self._compact(trimmed)
+        return trimmed
+
+    def _compact(self, turns):
+        if turns and self.compaction_enabled:
+            self.compactor.add(turns)
+
+    def _on_compacted(self, summary):
+        # The summary changes the system prompt, so the cached context and
+        # the history budget both have to follow it. Runs on the compactor
+        # thread, so a reply streaming meanwhile must not keep its context.
+        with self._history_lock:
+            self.reset_context()
+            self._update_prompt_budget()
 
-    def _stop_current_model(self):
+    def reset_context(self):
+        """Drop Ollama's KV context so the next turn rebuilds the full prompt"""
+        with self._history_lock:
+            self.ollama_context = None
+            self._context_epoch += 1
+
+    @property
+    def model_options(self):
+        return {"num_ctx": self.num_ctx}
+
+    def preload_model(self):
+        """Warm the current model in the background"""
+        return self.lifecycle.preload(self.model_name, self.model_options)
+
+    def prefetch_model(self):
+        """Reload the model if it was unloaded; called as the user starts typing"""
+        return self.lifecycle.ensure_loaded(self.model_name, self.model_options)
+
+    def shutdown(self, keep_models=()):
+        """Stop background work and unload the models used, except keep_models"""
+        self.cancel_generation()
+        self.files.stop_watching()
+        self.compactor.stop()
+        self.lifecycle.shutdown(keep=keep_models)
+        for cache in (self.response_cache, self.summary_cache):
+            if cache is not None:
+                cache.close()
+
+    def switch_personality(self, personality_name):
+        """Switch personality without blocking; the model loads in the background.
+
+        Like restore_history, callers wait for a streaming reply to stop
+        first, so its partial text is carried over with the rest.
+        """
+        if personality_name not in self.personalities:
+            return False
+
+        self.cancel_generation()
+        previous_model = self.model_name
+        carried_history = list(self.conversation_history)
+        carried_summary = self.compactor.summary
+        carried_pending = self.compactor.pending_turns()
+
+        self.current_personality = personality_name
+        self._configure_personality()
+        self._carry_over(carried_history, carried_summary, carried_pending)
+        settings = load_settings()
+        settings["personality"] = personality_name
+        save_settings(settings)
+
+        self._switch_generation += 1
+        self.set_face_state(PERSONALITY_FACES.get(personality_name, "THINKING"))
+        threading.Thread(
+            target=self._transition_models,
+            args=(previous_model, self.model_name, self._switch_generation),
+            daemon=True
+        ).start()
+        return True
+
+    def _carry_over(self, history, summary, pending):
+        # History is kept as plain text, so any model can pick it up; only the
+        # model-specific token context is dropped and rebuilt on the next turn.
+        if summary:
+            self.compactor.reset(summary=summary)
+            self._update_prompt_budget()
+        self._compact(pending)
+        for role, content in history:
+            self._append_history(role, content)
+        self.reset_context()
+
+    def restore_history(self, turns):
+        """Replace the conversation with saved (role, content) turns, e.g. when reopening a session.
+
+        Callers wait for a streaming reply to stop first (see cancel_generation),
+        so the GUI thread is never blocked here.
+        """
+        self.cancel_generation()
+        self.compactor.reset(summary="")
+        self.conversation_history.clear()
+        self._update_prompt_budget()
+        for role, content in turns:
+            self._append_history(role, content)
+        self.reset_context()
+
+    def _has_standby_headroom(self, model_name):
+        """True if model_name fits in free RAM with the previous model still loaded"""
+        settings = load_settings()
+        headroom = settings.get("standby_headroom_mb", STANDBY_HEADROOM_MB) * 1024 * 1024
         try:
-            subprocess.run(["ollama", "stop", self.model_name], check=True)
-            print(f"Stopped model: {self.model_name}")
+            sizes = {model.get("name"): model.get("size", 0) for model in self.client.list_models()}
         except Exception as e:
-            print(f"Error stopping model {self.model_name}: {e}")
+            print(f"Error listing models: {e}")
+            return False
+        needed = sizes.get(model_name, 0) * MODEL_MEMORY_FACTOR + headroom
+        return psutil.virtual_memory().available >= needed
 
-    def switch_personality(self, personality_name):
-        if personality_name in self.personalities:
-            self._stop_current_model()
-            self.current_personality = personality_name
-            self._configure_personality()
-            settings = load_settings()
-            settings["personality"] = personality_name
-            save_settings(settings)
-            self.conversation_history.clear()
-            
-            if personality_name == "analytical":
-                self.animation_manager.set_face_state("ANALYSIS")
-                threading.Timer(4.0, lambda: self.animation_manager.set_face_state("IDLE")).start()
-            elif personality_name == "conversational":
-                self.animation_manager.set_face_state("CHATTING")
-                threading.Timer(4.0, lambda: self.animation_manager.set_face_state("IDLE")).start()
-            
-            return True
-        return False
+    def _transition_models(self, previous_model, new_model, switch_generation):
+        started = time.monotonic()
+        self.event_manager.publish("MODEL_LOADING", new_model)
+        if previous_model != new_model and not self.lifecycle.is_loaded(new_model):
+            if not self._has_standby_headroom(new_model) and previous_model != self.model_name:
+                self.lifecycle.unload(previous_model)
+        self.lifecycle.preload(new_model, self.model_options)
+        timeout = load_settings().get("model_load_timeout_seconds", MODEL_LOAD_TIMEOUT_SECONDS)
+        loaded = self.lifecycle.wait_until_loaded(new_model, timeout)
+
+        if switch_generation != self._switch_generation:
+            return
+        if not loaded:
+            # The next message retries the load through prefetch/generate
+            self.event_manager.publish("MODEL_LOAD_FAILED", new_model)
+            if not self.is_generating:
+                self.set_face_state("IDLE")
+            return
+        self.event_manager.publish("MODEL_READY", new_model)
+        # Give the personality face its moment before returning to idle
+        time.sleep(max(0.0, PERSONALITY_FACE_SECONDS - (time.monotonic() - started)))
+        if switch_generation == self._switch_generation and not self.is_generating:
+            self.set_face_state("IDLE")
 
     def build_system_prompt(self):
+        if self.compactor.summary:
+            return f"{self.base_system_prompt}\n\nMemory of the earlier conversation:\n{self.compactor.summary}"
         return self.base_system_prompt
 
-    def format_conversation_history(self):
-        return "\n".join(f"{role}: {content}" for role, content in self.conversation_history)
+    def format_conversation_history(self, history=None):
+        if history is None:
+            with self._history_lock:
+                history = list(self.conversation_history)
+        return "\n".join(f"{role}: {content}" for role, content in history)
+
+    def format_full_prompt(self, system_prompt=None, history=None):
+        system_prompt = self.build_system_prompt() if system_prompt is None else system_prompt
+        return f"SYSTEM: {system_prompt}\n{self.format_conversation_history(history)}"
+
+    def complete(self, prompt, personality=None, history=(), on_chunk=None):
+        """Run one stand-alone generation that leaves the chat session untouched.
+
+        Safe to call from several threads at once. Returns the reply together
+        with its timing: time to first token, total time and token counts.
+        """
+        config = self.personalities[personality or self.current_personality]
+        turns = [tuple(turn) for turn in history] + [("User", prompt)]
+        payload = {
+            "model": config["model_name"],
+            "prompt": self.format_full_prompt(config["system_prompt"], turns),
+            "stream": True,
+            "options": {"num_ctx": config.get("num_ctx", config["max_tokens"])},
+            "keep_alive": self.lifecycle.keep_alive
+        }
+        started = time.perf_counter()
+        first_token = None
+        parts = []
+        final_response = {}
+        response = self.client.generate(payload)
+        try:
+            for json_response in self.client.iter_stream(response):
+                chunk = json_response.get("response")
+                if chunk:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    parts.append(chunk)
+                    if on_chunk:
+                        on_chunk(chunk)
+                if json_response.get("done"):
+                    final_response = json_response
+        finally:
+            response.close()
+        self.lifecycle.note_activity(payload["model"])
+        return {
+            "model": payload["model"],
+            "response": "".join(parts),
+            "ttft_seconds": first_token,
+            "total_seconds": time.perf_counter() - started,
+            "prompt_eval_count": final_response.get("prompt_eval_count", 0),
+            "eval_count": final_response.get("eval_count", 0)
+        }
+
+    def build_request(self, user_input, prompt_text=None):
+        """Build the /api/generate payload for the newest user turn.
+
+        When Ollama's context from the previous turn is still valid only the
+        new user message is sent, so the model does not prefill the whole
+        conversation again. Otherwise the flattened history is sent in full.
+        prompt_text, the user turn with retrieved excerpts, replaces the
+        plain turn in this request only; history keeps user_input.
+        """
+        prompt_text = prompt_text or user_input
+        payload = {
+            "model": self.model_name,
+            "stream": True,
+            "options": self.model_options,
+            "keep_alive": self.lifecycle.keep_alive
+        }
+        if self.reuse_context and self.ollama_context:
+            payload["prompt"] = f"User: {prompt_text}"
+            payload["context"] = self.ollama_context
+        else:
+            with self._history_lock:
+                # Older turns make room for the excerpts in this request only
+                extra = estimate_tokens(prompt_text) - estimate_tokens(user_input)
+                history = self.conversation_history.window(extra)
+            if history and prompt_text != user_input:
+                history[-1] = ("User", prompt_text)
+            payload["prompt"] = self.format_full_prompt(history=history)
+        return payload
+
+    def _with_retrieved_context(self, user_input):
+        """Prefix the user turn with the best matching ai_files snippets, if any"""
+        if self.retriever is None:
+            return user_input
+        # Never let snippets take more than a quarter of the history budget
+        budget = min(self.retrieval_tokens, self.conversation_history.budget // 4)
+        try:
+            context = self.retriever.build_context(user_input, budget, self.retrieval_top_k)
+        except Exception as e:
+            print(f"Error searching retrieval index: {e}")
+            return user_input
+        if not context:
+            return user_input
+        return f"Relevant excerpts from your files:\n{context}\n\nQuestion: {user_input}"
+
+    def _append_history(self, role, content, tokens=None):
+        """Append a turn, returning True if older turns were trimmed to fit"""
+        with self._history_lock:
+            trimmed = self.conversation_history.append((role, content), tokens)
+            self._compact(trimmed)
+        if trimmed:
+            # The cached context still holds the trimmed turns: rebuild from
+            # history next time so the prompt fits num_ctx again.
+            self.reset_context()
+        return bool(trimmed)
 
-    def format_full_prompt(self):
-        return f"SYSTEM: {self.build_system_prompt()}\n{self.format_conversation_history()}"
+    def _record_turn(self, role, content):
+        """Announce a finished turn so it can be persisted"""
+        self.event_manager.publish("CONVERSATION_TURN", {
+            "role": role,
+            "content": content,
+            "personality": self.current_personality
+        })
+
+    def set_face_state(self, state):
+        """Request a face change; the GUI applies it on the Tk thread"""
+        self.event_manager.publish("FACE_STATE_CHANGE", state)
 
     def set_face_on_chunk(self):
-        if self.animation_manager.current_face_state != "REPLY":
-            self.animation_manager.set_face_state("REPLY")
+        self.set_face_state("REPLY")
+
+    @property
+    def is_generating(self):
+        return self.current_generation is not None and self.current_generation.is_active
 
     def handle_user_input(self, user_input):
+        # Never let a background summary compete with a live reply
+        self.compactor.interrupt()
+        previous = self.current_generation
+        if previous is not None and previous.is_active:
+            # Preempt the running reply instead of streaming two at once
+            previous.cancel()
+        handle = GenerationHandle(previous)
+        self.current_generation = handle
+
+        self.set_face_state("THINKING")
+        threading.Thread(target=self.fetch_response, args=(user_input, handle), daemon=True).start()
+        return handle
+
+    def cancel_generation(self, wait_seconds=None):
+        """Cancel the reply currently streaming, returning True if there was one.
+
+        With wait_seconds, also wait for the stream thread to record its
+        partial reply, so the caller can safely replace the history.
+        """
+        handle = self.current_generation
+        if handle is None or not handle.is_active:
+            return False
+        handle.cancel()
+        if wait_seconds:
+            handle.done.wait(wait_seconds)
+        return True
+
+    def fetch_response(self, user_input, handle=None):
+        handle = handle or GenerationHandle()
+        if handle.previous is not None:
+            # Let a preempted reply commit its partial text before this turn
+            handle.previous.done.wait()
+        handle.previous = None
+        # Shown only now, so a preempted reply's marker and completion land
+        # before the new user line instead of after it
         self.event_manager.publish("DISPLAY_USER_MESSAGE", user_input)
         self.event_manager.publish("AI_THINKING_START")
-        self.animation_manager.set_face_state("THINKING")
-        threading.Thread(target=self.fetch_response, args=(user_input,), daemon=True).start()
 
-    def fetch_response(self, user_input):
-        self.conversation_history.append(("User", user_input))
-        full_context = self.format_full_prompt()
+        try:
+            command, _, argument = user_input.strip().partition(" ")
+            if command == SUMMARIZE_COMMAND:
+                self._summarize_file(user_input, argument.strip(), handle)
+            else:
+                self._stream_response(user_input, handle)
+        finally:
+            handle.done.set()
+
+    def _cache_key(self, user_input):
+        """Key for the newest user turn, or None if this personality does not cache"""
+        if self.response_cache is None or not self.cache_ttl:
+            return None
+        # Key on the whole budgeted history, as the model sees it either way;
+        # the user turn itself is already the last entry
+        with self._history_lock:
+            history = list(self.conversation_history)[:-1]
+        return make_cache_key(self.model_name, self.build_system_prompt(), history, user_input)
+
+    def cache_stats(self):
+        return self.response_cache.stats() if self.response_cache is not None else {}
+
+    def _replay_cached(self, response_text, handle):
+        """Publish a cached reply through the same chunk path as a live one"""
+        self.set_face_on_chunk()
+        replayed = ""
+        for piece in REPLAY_PIECE.findall(response_text):
+            if handle.cancelled.is_set():
+                replayed += CANCELLED_MARKER
+                self.event_manager.publish("AI_RESPONSE_CHUNK", CANCELLED_MARKER)
+                break
+            replayed += piece
+            self.event_manager.publish("AI_RESPONSE_CHUNK", piece)
+        self._append_history("Assistant", replayed)
+        self._record_turn("Assistant", replayed)
+        # Ollama's context never saw this exchange, so rebuild on the next turn
+        self.reset_context()
+        self._finish_response(handle)
+
+    def _stream_response(self, user_input, handle):
+        # The snippets only go into this request and its cache key; history
+        # keeps the plain question so later prompts do not resend them
+        prompt_text = self._with_retrieved_context(user_input)
+        self._append_history("User", user_input)
+        self._record_turn("User", user_input)
+        cache_key = self._cache_key(prompt_text)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key, ttl=self.cache_ttl)
+            if cached is not None:
+                self._replay_cached(cached, handle)
+                return
+        with self._history_lock:
+            payload = self.build_request(user_input, prompt_text)
+            context_epoch = self._context_epoch
+        personality = self.current_personality
         complete_response = ""
         first_chunk = True
+        final_response = {}
 
+        self.lifecycle.note_activity(payload["model"])
         try:
-            response = requests.post(
-                f"{OLLAMA_API_BASE}/generate",
-                json={"model": self.model_name, "prompt": full_context, "stream": True},
-                stream=True
-            )
+            if not handle.cancelled.is_set():
+                response = self.client.generate(payload)
+                handle.attach(response)
 
-            for line in response.iter_lines(decode_unicode=True):
-                if line:
-                    json_response = json.loads(line)
+                for json_response in self.client.iter_stream(response):
+                    if handle.cancelled.is_set():
+                        break
                     if 'response' in json_response:
                         if first_chunk:
                             self.set_face_on_chunk()
@@ -126,13 +582,117 @@ class ChatbotHandler:
                         chunk = json_response['response']
                         complete_response += chunk
                         self.event_manager.publish("AI_RESPONSE_CHUNK", chunk)
+                    if json_response.get('done'):
+                        final_response = json_response
+
+        except Exception as e:
+            # Closing the stream from the GUI thread surfaces here as a read error
+            if not handle.cancelled.is_set():
+                if not isinstance(e, requests.exceptions.RequestException):
+                    raise
+                self.reset_context()
+                error_message = f"[Error contacting API: {e}]"
+                self.event_manager.publish("AI_RESPONSE_CHUNK", error_message)
+                self._finish_response(handle)
+                return
+
+        if handle.cancelled.is_set():
+            # Ollama never sent a final context for this turn
+            self.reset_context()
+            complete_response += CANCELLED_MARKER
+            self.event_manager.publish("AI_RESPONSE_CHUNK", CANCELLED_MARKER)
+            self._append_history("Assistant", complete_response)
+            self._record_turn("Assistant", complete_response)
+        else:
+            reply_tokens = final_response.get("eval_count")
+            if "context" in payload and prompt_text == user_input:
+                self._update_turn_count(payload["context"], final_response.get("context"), reply_tokens)
+            if reply_tokens:
+                reply_tokens += MESSAGE_OVERHEAD_TOKENS
+            trimmed = self._append_history("Assistant", complete_response, reply_tokens)
+            self._record_turn("Assistant", complete_response)
+            if cache_key is not None and complete_response.strip():
+                self.response_cache.put(cache_key, complete_response)
+            with self._history_lock:
+                if prompt_text != user_input:
+                    # The returned context holds excerpts the budget never
+                    # counted; rebuild from history so num_ctx is not overrun
+                    self.reset_context()
+                # A reset since the request (e.g. a new summary) means the context is stale
+                elif (self.reuse_context and not trimmed and personality == self.current_personality
+                        and context_epoch == self._context_epoch):
+                    self.ollama_context = final_response.get("context")
+        self._finish_response(handle)
+
+    def _update_turn_count(self, previous_context, context, reply_tokens):
+        """Charge the user turn what it actually added to Ollama's context.
+
+        prompt_eval_count may cover the whole context or, with prefix
+        caching, almost nothing, so the cost is taken from how much the
+        context grew instead: everything after the previous context that
+        is not the reply.
+        """
+        if not context or not reply_tokens:
+            return
+        tokens = len(context) - len(previous_context) - reply_tokens
+        if tokens > 0:
+            with self._history_lock:
+                self.conversation_history.update_last_count(tokens)
+
+    def _summarize_file(self, user_input, filename, handle):
+        """Answer /summarize <file> with a map-reduce summary of a document in ai_files"""
+        self._append_history("User", user_input)
+        self._record_turn("User", user_input)
+        self.set_face_on_chunk()
+        if not filename:
+            self.event_manager.publish("AI_RESPONSE_CHUNK", f"[Usage: {SUMMARIZE_COMMAND} <file in ai_files>]")
+            self._finish_response(handle)
+            return
 
-            self.conversation_history.append(("Assistant", complete_response))
-            self.event_manager.publish("AI_RESPONSE_COMPLETE")
-            self.animation_manager.set_face_state("IDLE")
+        # Parts must leave room in num_ctx for the instructions and the reply
+        self.summarizer.chunk_tokens = min(self.summary_chunk_tokens, self.num_ctx // 2)
+        streamed = []
+        def stream_summary(chunk):
+            if not streamed:
+                self.event_manager.publish("AI_RESPONSE_CHUNK", "\n\n")
+            streamed.append(chunk)
+            self.event_manager.publish("AI_RESPONSE_CHUNK", chunk)
+
+        self.lifecycle.note_activity(self.model_name)
+        try:
+            summary = self.summarizer.summarize(
+                filename,
+                self.model_name,
+                options=self.model_options,
+                keep_alive=self.lifecycle.keep_alive,
+                on_progress=lambda text: self.event_manager.publish("AI_RESPONSE_CHUNK", text),
+                on_chunk=stream_summary,
+                handle=handle
+            )
+        except FileNotFoundError:
+            summary = None
+            self.event_manager.publish("AI_RESPONSE_CHUNK", f"[Error: File '{filename}' not found.]")
+        except Exception as e:
+            summary = None
+            if handle.cancelled.is_set():
+                self.event_manager.publish("AI_RESPONSE_CHUNK", CANCELLED_MARKER)
+            else:
+                self.event_manager.publish("AI_RESPONSE_CHUNK", f"[Error summarizing '{filename}': {e}]")
+        if summary == "":
+            self.event_manager.publish("AI_RESPONSE_CHUNK", f"[No text to summarize in '{filename}'.]")
+        elif summary:
+            if not streamed:
+                stream_summary(summary)
+            # Only the summary itself becomes part of the conversation
+            self._append_history("Assistant", summary)
+            self._record_turn("Assistant", summary)
+        # The model's context never saw this exchange
+        self.reset_context()
+        self._finish_response(handle)
 
-        except requests.exceptions.RequestException as e:
-            error_message = f"[Error contacting API: {e}]"
-            self.event_manager.publish("AI_RESPONSE_CHUNK", error_message)
-            self.event_manager.publish("AI_RESPONSE_COMPLETE")
-            self.animation_manager.set_face_state("IDLE")
\ No newline at end of file
+    def _finish_response(self, handle):
+        self.compactor.note_activity()
+        self.lifecycle.note_activity(self.model_name)
+        self.event_manager.publish("AI_RESPONSE_COMPLETE")
+        if self.current_generation in (None, handle):
+            self.set_face_state("IDLE")
@@ -0,0 +1,194 @@
+import re
+import threading
+import time
+from .token_budget import estimate_tokens
+
+COMPACTION_IDLE_SECONDS = 5
+SUMMARY_MAX_TOKENS = 400
+MAX_BATCH_TOKENS = 2048
+RETRY_BACKOFF_SECONDS = 30
+MAX_RETRY_BACKOFF_SECONDS = 600
+THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+SUMMARY_PROMPT = (
+    "Condense the conversation below into a short memory for an assistant. "
+    "Keep facts about the user, decisions made, names, numbers and open questions. "
+    "Drop greetings and filler. Reply with the summary only.\n\n"
+    "{existing}Conversation:\n{transcript}"
+)
+
+class ConversationCompactor:
+    """Folds turns trimmed from the history into a running summary.
+
+    Summaries are produced on a background thread and only once the user
+    has been quiet for idle_seconds, so a live reply never waits on one.
+    A summary request in flight is dropped as soon as a new message is sent.
+    Failed summaries are retried with an exponential backoff. With a
+    lifecycle, summary requests keep the model loaded like chat requests do.
+    """
+
+    def __init__(self, client, model_name, is_idle, idle_seconds=COMPACTION_IDLE_SECONDS, on_summary=None,
+                 lifecycle=None):
+        self.client = client
+        self.lifecycle = lifecycle
+        self.model_name = model_name
+        self.options = {}
+        self.is_idle = is_idle
+        self.idle_seconds = idle_seconds
+        self.on_summary = on_summary
+        self.summary = ""
+        self.last_activity = time.monotonic()
+        self._pending = []
+        self._generation = 0
+        self._failures = 0
+        self._response = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def pending_turns(self):
+        with self._lock:
+            return list(self._pending)
+
+    def add(self, turns):
+        """Queue trimmed (role, content) turns for summarization"""
+        if turns:
+            with self._lock:
+                self._pending.extend(turns)
+            self._wake.set()
+
+    def note_activity(self):
+        self.last_activity = time.monotonic()
+
+    def interrupt(self):
+        """Abort a summary in flight so it does not compete with a live reply"""
+        self.note_activity()
+        with self._lock:
+            response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def reset(self, model_name=None, summary="", options=None):
+        """Discard pending turns and start over, e.g. after a personality change"""
+        with self._lock:
+            self._generation += 1
+            self._pending.clear()
+            self.summary = summary
+            if model_name:
+                self.model_name = model_name
+            if options is not None:
+                self.options = options
+        self.interrupt()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        self.interrupt()
+
+    def _wait_for_idle(self):
+        while not self._stopped.is_set():
+            remaining = self.last_activity + self.idle_seconds - time.monotonic()
+            if remaining <= 0 and self.is_idle():
+                return True
+            self._stopped.wait(max(remaining, 0.5))
+        return False
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            if not self._wait_for_idle():
+                break
+            with self._lock:
+                turns = self._next_batch()
+                generation = self._generation
+                summary = self.summary
+                model_name = self.model_name
+                if not turns:
+                    self._wake.clear()
+                    continue
+
+            started = time.monotonic()
+            try:
+                new_summary = self._summarize(model_name, summary, turns, started)
+            except Exception as e:
+                # Failed or interrupted: keep the turns and retry after the
+                # next quiet period, backing off first if it was not the user
+                if self.last_activity < started:
+                    self._back_off(e)
+                self.note_activity()
+                continue
+            finally:
+                with self._lock:
+                    self._response = None
+
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                if new_summary:
+                    self._failures = 0
+                    self.summary = new_summary
+                    del self._pending[:len(turns)]
+                    if not self._pending:
+                        self._wake.clear()
+            if not new_summary:
+                self._back_off(None)
+                self.note_activity()
+                continue
+            if self.on_summary:
+                self.on_summary(new_summary)
+
+    def _back_off(self, error):
+        """Wait longer after each consecutive failure, reporting only the first"""
+        if not self._failures:
+            print(f"Error compacting conversation: {error or 'empty summary'}")
+        delay = min(RETRY_BACKOFF_SECONDS * 2 ** self._failures, MAX_RETRY_BACKOFF_SECONDS)
+        self._failures += 1
+        self._stopped.wait(delay)
+
+    def _next_batch(self):
+        # Long backlogs are folded in a few turns at a time so that each
+        # summary request stays well inside the model's context window.
+        batch, tokens = [], 0
+        for turn in self._pending:
+            tokens += estimate_tokens(turn[1])
+            if batch and tokens > MAX_BATCH_TOKENS:
+                break
+            batch.append(turn)
+        return batch
+
+    def _summarize(self, model_name, summary, turns, started):
+        transcript = "\n".join(f"{role}: {content}" for role, content in turns)
+        existing = f"Existing memory:\n{summary}\n\n" if summary else ""
+        options = dict(self.options)
+        options["num_predict"] = SUMMARY_MAX_TOKENS
+        payload = {
+            "model": model_name,
+            "prompt": SUMMARY_PROMPT.format(existing=existing, transcript=transcript),
+            "stream": True,
+            "options": options
+        }
+        if self.lifecycle is not None:
+            # Without it Ollama would fall back to its own expiry for the model
+            payload["keep_alive"] = self.lifecycle.keep_alive
+        response = self.client.generate(payload)
+        with self._lock:
+            self._response = response
+        parts = []
+        try:
+            for json_response in self.client.iter_stream(response):
+                if self.last_activity >= started:
+                    raise InterruptedError("user became active")
+                parts.append(json_response.get("response", ""))
+        finally:
+            response.close()
+            if self.lifecycle is not None:
+                self.lifecycle.note_activity(model_name)
+        return THINK_BLOCK.sub("", "".join(parts)).strip()
@@ -0,0 +1,244 @@
+import queue
+import sqlite3
+import threading
+import time
+
+CONVERSATION_DB_PATH = "conversations.sqlite3"
+HISTORY_PAGE_SIZE = 50
+COMMIT_INTERVAL = 0.5
+COMMIT_BATCH = 64
+SEARCH_LIMIT = 20
+SNIPPET_CHARS = 80
+PREFIX_MIN_CHARS = 3
+_REBUILD_INDEX = object()
+
+class ConversationStore:
+    """Persists chat turns in SQLite and reads them back a page at a time.
+
+    Appends are queued and written by a background thread that commits in
+    batches, so the Tk and streaming threads never wait on disk. The database
+    runs in WAL mode, letting page reads proceed while a batch is committing.
+    An FTS5 index over the messages is kept up to date by triggers inside the
+    same batches; builds of SQLite without FTS5 fall back to LIKE scans.
+    """
+
+    def __init__(self, path=CONVERSATION_DB_PATH, commit_interval=COMMIT_INTERVAL, commit_batch=COMMIT_BATCH):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.commit_batch = commit_batch
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self.full_text = False
+        self._create_schema()
+        # Searches get their own connection so a slow ranking never holds up paging
+        self._search_db = self._connect()
+        self._search_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent on power loss with NORMAL; only
+        # the last batch can be lost, never corrupted
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _create_schema(self):
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id INTEGER PRIMARY KEY, created REAL NOT NULL, updated REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL REFERENCES sessions(id), "
+                "role TEXT NOT NULL, content TEXT NOT NULL, personality TEXT, created REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS messages_session ON messages(session_id, id);"
+            )
+            self._db.commit()
+            self._create_search_index()
+
+    def _create_search_index(self):
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        ).fetchone()
+        try:
+            self._db.executescript(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+                "content, content='messages', content_rowid='id', prefix='3');"
+                "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+                "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END;"
+                "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+                "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END;"
+            )
+            self._db.commit()
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, falling back to LIKE: {e}")
+            return
+        self.full_text = True
+        if not exists:
+            # Index messages saved before search existed, on the writer thread
+            self._queue.put(_REBUILD_INDEX)
+
+    def create_session(self):
+        """Start a new conversation and return its id"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute("INSERT INTO sessions (created, updated) VALUES (?, ?)", (now, now))
+            self._db.commit()
+            return cursor.lastrowid
+
+    def latest_session(self):
+        """Return the id of the most recently used conversation, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT id FROM sessions ORDER BY updated DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def append(self, session_id, role, content, personality=None):
+        """Queue a turn for the writer thread; returns immediately"""
+        self._queue.put((session_id, role, content, personality, time.time()))
+
+    def load_page(self, session_id, before_id=None, after_id=None, limit=HISTORY_PAGE_SIZE):
+        """Return up to limit (id, role, content) rows, oldest first.
+
+        By default this is the newest page; before_id pages backwards from a
+        message and after_id pages forwards from one.
+        """
+        with self._lock:
+            if after_id is not None:
+                return self._db.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (session_id, after_id, limit)
+                ).fetchall()
+            if before_id is None:
+                rows = self._db.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                    (session_id, limit)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (session_id, before_id, limit)
+                ).fetchall()
+        rows.reverse()
+        return rows
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Find messages in every session, best match first.
+
+        Returns dicts with message_id, session_id, role, snippet and created.
+        The last word matches as a prefix once it is PREFIX_MIN_CHARS long,
+        so results can follow typing without expanding to every short stem.
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        try:
+            with self._search_lock:
+                if self.full_text:
+                    rows = self._search_full_text(terms, limit)
+                else:
+                    rows = self._search_like(terms, limit)
+        except sqlite3.Error as e:
+            print(f"Error searching conversations: {e}")
+            return []
+        return [
+            {"message_id": row[0], "session_id": row[1], "role": row[2], "snippet": row[3], "created": row[4]}
+            for row in rows
+        ]
+
+    def _search_full_text(self, terms, limit):
+        # Quote every word so user text can never be parsed as FTS5 syntax
+        match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        if len(terms[-1]) >= PREFIX_MIN_CHARS:
+            match += "*"
+        return self._search_db.execute(
+            "SELECT m.id, m.session_id, m.role, snippet(messages_fts, 0, '[', ']', '...', 12), m.created "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit)
+        ).fetchall()
+
+    def _search_like(self, terms, limit):
+        patterns = ["%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for term in terms]
+        where = " AND ".join("content LIKE ? ESCAPE '\\'" for _ in patterns)
+        rows = self._search_db.execute(
+            f"SELECT id, session_id, role, content, created FROM messages WHERE {where} ORDER BY id DESC LIMIT ?",
+            (*patterns, limit)
+        ).fetchall()
+        return [(row[0], row[1], row[2], _snippet(row[3], terms[0]), row[4]) for row in rows]
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued turn has been committed"""
+        committed = threading.Event()
+        self._queue.put(committed)
+        return committed.wait(timeout)
+
+    def close(self, timeout=5.0):
+        self._queue.put(None)
+        self._writer.join(timeout)
+        with self._lock:
+            self._db.close()
+        with self._search_lock:
+            self._search_db.close()
+
+    def _write_loop(self):
+        db = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch, waiters, stopping = [], [], False
+                deadline = time.monotonic() + self.commit_interval
+                # Gather whatever else arrives shortly so a burst costs one commit
+                while True:
+                    if item is None:
+                        stopping = True
+                    elif item is _REBUILD_INDEX:
+                        self._rebuild_search_index(db)
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if stopping or waiters or len(batch) >= self.commit_batch:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write_batch(db, batch)
+                for waiter in waiters:
+                    waiter.set()
+                if stopping:
+                    return
+        finally:
+            db.close()
+
+    def _rebuild_search_index(self, db):
+        try:
+            with db:
+                db.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+        except sqlite3.Error as e:
+            print(f"Error building search index: {e}")
+
+    def _write_batch(self, db, batch):
+        updated = {session_id: created for session_id, _, _, _, created in batch}
+        try:
+            with db:
+                db.executemany(
+                    "INSERT INTO messages (session_id, role, content, personality, created) VALUES (?, ?, ?, ?, ?)",
+                    batch
+                )
+                db.executemany(
+                    "UPDATE sessions SET updated = ? WHERE id = ?",
+                    [(created, session_id) for session_id, created in updated.items()]
+                )
+        except sqlite3.Error as e:
+            print(f"Error saving conversation: {e}")
+
+def _snippet(content, term, width=SNIPPET_CHARS):
+    """Cut a window of content around the first occurrence of term"""
+    position = max(content.lower().find(term.lower()), 0)
+    start = max(position - width // 2, 0)
+    text = " ".join(content[start:start + width].split())
+    return ("..." if start else "") + text + ("..." if start + width < len(content) else "")
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .conversation_compactor import THINK_BLOCK
+from .token_budget import estimate_tokens
+
+SUMMARIZE_COMMAND = "/summarize"
+SUMMARY_CHUNK_TOKENS = 2000
+SUMMARY_PARALLEL = 2
+SUMMARY_CACHE_PATH = "summary_cache.sqlite3"
+PART_SUMMARY_TOKENS = 300
+BOUNDARY_MODULUS = 8
+MAP_PROMPT = (
+    "Summarize this part of the document {name}. Keep the key facts, names, numbers, "
+    "decisions and conclusions. Reply with the summary only.\n\n{text}"
+)
+REDUCE_PROMPT = (
+    "Below are summaries of consecutive parts of the document {name}. Combine them into "
+    "one summary in the same order, merging repeated points. Reply with the summary only.\n\n{text}"
+)
+
+def summary_key(model_name, prompt):
+    """Cache key of one map or reduce step: the model and the exact prompt it was given"""
+    material = json.dumps(["summary", model_name, prompt])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class DocumentSummarizer:
+    """Map-reduce summaries of ai_files documents too large for one prompt.
+
+    The document is streamed into chunks of about chunk_tokens and every
+    chunk is summarized on its own, at most `parallel` requests at a time so
+    the queue matches Ollama's parallel slots. Chunks are read only as the
+    queue drains, so just their summaries are held in memory. The partial
+    summaries are then combined in groups that fit the same budget, level by
+    level, until one remains. Each step is cached under a hash of its prompt
+    in a store of its own, so after an edit only the changed chunks and the
+    reduce steps above them run again. Chunks end at lines picked by their
+    content rather than by position, so an insertion early in a file does
+    not shift every later chunk.
+    """
+
+    def __init__(self, client, manager, cache=None, parallel=SUMMARY_PARALLEL, chunk_tokens=SUMMARY_CHUNK_TOKENS):
+        self.client = client
+        self.manager = manager
+        self.cache = cache
+        self.parallel = max(1, parallel)
+        self.chunk_tokens = chunk_tokens
+
+    def summarize(self, name, model_name, options=None, keep_alive=None,
+                  on_progress=None, on_chunk=None, handle=None):
+        """Summarize ai_files/name, returning the final summary.
+
+        on_progress receives short status text as parts finish and on_chunk
+        the final summary as it streams. handle is the GenerationHandle whose
+        cancellation aborts every request in flight.
+        """
+        request = {"model": model_name, "options": options or {}, "keep_alive": keep_alive}
+        report = on_progress or (lambda text: None)
+        report(f"[{name}] ")
+        prompts = (MAP_PROMPT.format(name=name, text=text) for text in self._iter_parts(name))
+        summaries = self._run(prompts, request, report, on_chunk, handle)
+        if not summaries:
+            return ""
+        while len(summaries) > 1:
+            groups = self._group(summaries)
+            report(f"\n[Combining {len(summaries)} summaries] ")
+            prompts = [REDUCE_PROMPT.format(name=name, text="\n\n".join(group)) for group in groups]
+            summaries = self._run(prompts, request, report, on_chunk, handle)
+        return summaries[0]
+
+    def _iter_parts(self, name):
+        if self.manager.is_binary(name):
+            return
+        lines, tokens = [], 0
+        for line in self.manager.iter_lines(name):
+            count = estimate_tokens(line)
+            if lines and tokens + count > self.chunk_tokens:
+                yield "".join(lines)
+                lines, tokens = [], 0
+            lines.append(line)
+            tokens += count
+            # Past half the budget, end after any line whose hash picks it
+            if tokens >= self.chunk_tokens // 2 and zlib.crc32(line.encode("utf-8")) % BOUNDARY_MODULUS == 0:
+                yield "".join(lines)
+                lines, tokens = [], 0
+        text = "".join(lines)
+        if text.strip():
+            yield text
+
+    def _group(self, summaries):
+        """Pack consecutive summaries into groups of at least two that fit chunk_tokens"""
+        groups, tokens = [[]], 0
+        for summary in summaries:
+            count = estimate_tokens(summary)
+            if len(groups[-1]) >= 2 and tokens + count > self.chunk_tokens:
+                groups.append([])
+                tokens = 0
+            groups[-1].append(summary)
+            tokens += count
+        if len(groups) > 1 and len(groups[-1]) == 1:
+            # A lone trailing summary would just be copied up a level
+            groups[-2].extend(groups.pop())
+        return groups
+
+    def _run(self, prompts, request, report, on_chunk, handle):
+        """Run every prompt, returning the results in order.
+
+        prompts may be a generator: it is read one prompt ahead of the
+        requests in flight. on_chunk only streams a step that is alone.
+        """
+        results, cached = [], 0
+        in_flight = {}
+        executor = ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix="summarize")
+        try:
+            for i, (prompt, alone) in enumerate(_with_alone(prompts)):
+                result = None
+                if self.cache is not None:
+                    result = self.cache.get(summary_key(request["model"], prompt), count=False)
+                results.append(result)
+                if result is not None:
+                    cached += 1
+                    if alone and on_chunk:
+                        on_chunk(result)
+                    continue
+                if len(in_flight) >= self.parallel:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done, in_flight, results, request, report)
+                stream = on_chunk if alone else None
+                in_flight[executor.submit(self._generate, prompt, request, stream, handle)] = (i, prompt, stream)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                self._collect(done, in_flight, results, request, report)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if cached and len(results) > 1:
+            report(f"({cached} cached) ")
+        return results
+
+    def _collect(self, done, in_flight, results, request, report):
+        for future in done:
+            i, prompt, stream = in_flight.pop(future)
+            results[i] = future.result()
+            if self.cache is not None and results[i]:
+                self.cache.put(summary_key(request["model"], prompt), results[i])
+            if not stream:
+                report(".")
+
+    def _generate(self, prompt, request, on_chunk, handle):
+        if handle is not None and handle.cancelled.is_set():
+            raise InterruptedError("summary cancelled")
+        options = dict(request["options"])
+        options.setdefault("num_predict", PART_SUMMARY_TOKENS if on_chunk is None else -1)
+        payload = {"model": request["model"], "prompt": prompt, "stream": True, "options": options}
+        if request["keep_alive"] is not None:
+            payload["keep_alive"] = request["keep_alive"]
+        response = self.client.generate(payload)
+        if handle is not None:
+            handle.attach(response)
+        parts = []
+        try:
+            for json_response in self.client.iter_stream(response):
+                if handle is not None and handle.cancelled.is_set():
+                    raise InterruptedError("summary cancelled")
+                chunk = json_response.get("response", "")
+                parts.append(chunk)
+                if on_chunk and chunk:
+                    on_chunk(chunk)
+        finally:
+            response.close()
+            if handle is not None:
+                handle.detach(response)
+        return THINK_BLOCK.sub("", "".join(parts)).strip()
+
+def _with_alone(items):
+    """Yield (item, alone) pairs, alone being True only for the single item of a one-item iterable"""
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        return
+    second = next(items, None)
+    if second is None:
+        yield first, True
+        return
+    yield first, False
+    yield second, False
+    for item in items:
+        yield item, False
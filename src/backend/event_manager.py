@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DRAIN_INTERVAL_MS = 10
+DRAIN_BUDGET_MS = 8
+SLOW_HANDLER_MS = 50
+WORKER_THREADS = 2
+
+class EventManager:
+    """Publish/subscribe bus with per-subscriber delivery policies.
+
+    INLINE handlers run on the publishing thread, MAIN_THREAD handlers are
+    queued and run by the Tk loop once attach_main_loop() has been called,
+    and WORKER handlers run on a small thread pool.
+    """
+
+    INLINE = "inline"
+    MAIN_THREAD = "main"
+    WORKER = "worker"
+
+    def __init__(self, worker_threads=WORKER_THREADS, slow_handler_ms=SLOW_HANDLER_MS):
+        self.subscribers = {}
+        self.handler_stats = {}
+        self.slow_handler_ms = slow_handler_ms
+        self.worker_threads = worker_threads
+        self._lock = threading.Lock()
+        self._main_queue = queue.SimpleQueue()
+        self._main_thread = threading.main_thread()
+        self._root = None
+        self._after_id = None
+        self._executor = None
+
+    def subscribe(self, event_type, handler, delivery=INLINE):
+        if delivery not in (self.INLINE, self.MAIN_THREAD, self.WORKER):
+            raise ValueError(f"Unknown delivery policy '{delivery}'")
+        with self._lock:
+            # Copy on write so publish() can iterate without holding the lock
+            handlers = list(self.subscribers.get(event_type, []))
+            handlers.append((handler, delivery))
+            self.subscribers[event_type] = handlers
+
+    def unsubscribe(self, event_type, handler):
+        with self._lock:
+            handlers = [entry for entry in self.subscribers.get(event_type, []) if entry[0] != handler]
+            self.subscribers[event_type] = handlers
+
+    def publish(self, event_type, data=None):
+        for handler, delivery in self.subscribers.get(event_type, ()):
+            if delivery == self.MAIN_THREAD and self._root is not None:
+                if threading.current_thread() is self._main_thread:
+                    # Run queued events first so delivery order is preserved
+                    self.drain()
+                    self._call(event_type, handler, data)
+                else:
+                    self._main_queue.put((event_type, handler, data))
+            elif delivery == self.WORKER:
+                self._get_executor().submit(self._call, event_type, handler, data)
+            else:
+                self._call(event_type, handler, data)
+
+    def attach_main_loop(self, root):
+        """Deliver MAIN_THREAD handlers on root's Tk loop from now on"""
+        self._root = root
+        self._main_thread = threading.current_thread()
+        self._schedule_drain()
+
+    def shutdown(self):
+        if self._after_id is not None and self._root is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._after_id = None
+        self._root = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def drain(self, budget_ms=None):
+        """Run queued main-thread handlers, stopping once budget_ms is spent"""
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+        while deadline is None or time.perf_counter() < deadline:
+            try:
+                event_type, handler, data = self._main_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._call(event_type, handler, data)
+
+    def get_handler_stats(self):
+        """Return {handler name: {count, total_ms, max_ms}} sorted by total time"""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self.handler_stats.items()}
+        return dict(sorted(stats.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def _schedule_drain(self):
+        if self._root is not None:
+            self._after_id = self._root.after(DRAIN_INTERVAL_MS, self._drain_loop)
+
+    def _drain_loop(self):
+        self._after_id = None
+        self.drain(DRAIN_BUDGET_MS)
+        self._schedule_drain()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.worker_threads,
+                        thread_name_prefix="event-worker"
+                    )
+        return self._executor
+
+    def _call(self, event_type, handler, data):
+        started = time.perf_counter()
+        try:
+            handler(data)
+        except Exception as e:
+            print(f"Error in handler for {event_type}: {e}")
+        finally:
+            self._record(event_type, handler, (time.perf_counter() - started) * 1000)
+
+    def _record(self, event_type, handler, elapsed_ms):
+        name = f"{event_type}:{getattr(handler, '__qualname__', repr(handler))}"
+        with self._lock:
+            stats = self.handler_stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            new_max = elapsed_ms > stats["max_ms"]
+            if new_max:
+                stats["max_ms"] = elapsed_ms
+        if new_max and elapsed_ms >= self.slow_handler_ms:
+            print(f"Slow event handler {name}: {elapsed_ms:.1f} ms")
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+SCAN_INTERVAL_SECONDS = 30
+
+class FileChangeTracker:
+    """Persisted stat cache of a folder tree that reports what changed between scans.
+
+    A directory's mtime only moves when entries are added, removed or
+    renamed, so directories whose mtime is unchanged are not listed again:
+    their known files are re-stat'ed to catch edits and their known
+    subdirectories are followed. Only changed directories go through
+    os.scandir. Hidden files and directories are ignored.
+    """
+
+    def __init__(self, root, state_path):
+        self.root = Path(root)
+        self.state_path = Path(state_path)
+        self.listeners = []
+        self._dirs = self._load_state()
+        self._scanned = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading file tracker state from {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self):
+        temp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(self._dirs, f, separators=(",", ":"))
+            os.replace(temp_path, self.state_path)
+        except Exception as e:
+            print(f"Error saving file tracker state to {self.state_path}: {e}")
+
+    def add_listener(self, callback):
+        """Call callback(changes) after every scan that found something"""
+        self.listeners.append(callback)
+
+    def files(self):
+        """Return every known file as a path relative to the root"""
+        if not self._scanned:
+            self.scan()
+        with self._lock:
+            return [_join(directory, name) for directory, entry in self._dirs.items() for name in entry["files"]]
+
+    def scan(self, full=False):
+        """Rescan the tree and return {"added", "modified", "removed"} lists of relative paths.
+
+        full=True lists every directory again, for filesystems whose
+        directory mtimes cannot be trusted.
+        """
+        with self._lock:
+            changes = {"added": [], "modified": [], "removed": []}
+            scanned = {}
+            stack = [""]
+            while stack:
+                directory = stack.pop()
+                try:
+                    stat = os.stat(self.root / directory)
+                except OSError:
+                    continue
+                old = self._dirs.get(directory)
+                if old is not None and old["mtime"] == stat.st_mtime_ns and not full:
+                    files, subdirs = self._restat(directory, old, changes)
+                else:
+                    files, subdirs = self._list(directory, old, changes)
+                scanned[directory] = {"mtime": stat.st_mtime_ns, "files": files, "dirs": subdirs}
+                stack.extend(_join(directory, name) for name in subdirs)
+
+            for directory, old in self._dirs.items():
+                if directory not in scanned:
+                    changes["removed"].extend(_join(directory, name) for name in old["files"])
+
+            dirty = scanned != self._dirs
+            self._dirs = scanned
+            self._scanned = True
+            if dirty:
+                self._save_state()
+        if any(changes.values()):
+            for listener in self.listeners:
+                listener(changes)
+        return changes
+
+    def _restat(self, directory, old, changes):
+        files = {}
+        for name, signature in old["files"].items():
+            try:
+                stat = os.stat(self.root / directory / name)
+            except OSError:
+                changes["removed"].append(_join(directory, name))
+                continue
+            files[name] = [stat.st_mtime_ns, stat.st_size]
+            if files[name] != signature:
+                changes["modified"].append(_join(directory, name))
+        return files, old["dirs"]
+
+    def _list(self, directory, old, changes):
+        old_files = old["files"] if old is not None else {}
+        files, subdirs = {}, []
+        try:
+            with os.scandir(self.root / directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = [stat.st_mtime_ns, stat.st_size]
+                        previous = old_files.get(entry.name)
+                        if previous is None:
+                            changes["added"].append(_join(directory, entry.name))
+                        elif previous != files[entry.name]:
+                            changes["modified"].append(_join(directory, entry.name))
+        except OSError as e:
+            print(f"Error scanning {self.root / directory}: {e}")
+        changes["removed"].extend(_join(directory, name) for name in old_files if name not in files)
+        return files, subdirs
+
+    def start(self, interval=SCAN_INTERVAL_SECONDS):
+        """Rescan every interval seconds on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self, interval):
+        while not self._stopped.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"Error scanning {self.root}: {e}")
+            self._stopped.wait(interval)
+
+    def stop(self):
+        self._stopped.set()
+
+def _join(directory, name):
+    return f"{directory}/{name}" if directory else name
@@ -1,7 +1,7 @@
 import tkinter as tk
 import customtkinter as ctk
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from .monitor_renderers import MONITOR_RENDERERS, DEFAULT_RENDERER
+from .search_popup import SearchResultsPopup
 from .settings_menu import SettingsMenu
 from .settings_manager import load_settings
 
@@ -13,10 +13,14 @@ class GUIManager:
         self.TEXTBOX_STYLE = self.THEME["TEXTBOX_STYLE"]
         self.INPUT_TEXTBOX_STYLE = self.THEME["INPUT_TEXTBOX_STYLE"]
         self.settings_window = None
+        self.search_popup = None
+        self._search_after_id = None
         self.setup_main_window()
         self.root.bind('<<ReopenSettings>>', self._reopen_settings)
         self.input_field.bind("<Return>", self._handle_return)
         self.input_field.bind("<Shift-Return>", self._handle_shift_return)
+        self.input_field.bind("<FocusIn>", self.app.on_input_activity)
+        self.input_field.bind("<KeyPress>", self.app.on_input_activity)
 
     def _handle_return(self, event):
         if not event.state & 0x1:
@@ -62,9 +66,13 @@ class GUIManager:
         personalities = ["conversational", "analytical"]
         current_personality = settings.get("personality", "conversational")
         
+        # The selector, model status and search share row 0 side by side
+        self.top_bar = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        self.top_bar.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+
         self.personality_var = ctk.StringVar(value=current_personality)
         self.personality_dropdown = ctk.CTkOptionMenu(
-            self.main_frame,
+            self.top_bar,
             variable=self.personality_var,
             values=personalities,
             command=self._on_personality_select,
@@ -77,7 +85,29 @@ class GUIManager:
             dropdown_text_color=self.THEME["TEXT_COLOR"],
             font=self.THEME["BUTTON_STYLE"]["font"]
         )
-        self.personality_dropdown.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        self.personality_dropdown.pack(side="left")
+
+        self.model_status_label = ctk.CTkLabel(
+            self.top_bar,
+            text="",
+            text_color=self.THEME["TEXT_COLOR"],
+            font=self.THEME["BUTTON_STYLE"]["font"]
+        )
+        self.model_status_label.pack(side="left", padx=10)
+
+        self.search_entry = ctk.CTkEntry(
+            self.top_bar,
+            placeholder_text="Search conversations",
+            width=260,
+            fg_color=self.THEME["INPUT_BG_COLOR"],
+            border_color=self.THEME["BUTTON_ACTIVE_COLOR"],
+            text_color=self.THEME["TEXT_COLOR"],
+            font=self.THEME["BUTTON_STYLE"]["font"]
+        )
+        self.search_entry.pack(side="right")
+        self.search_entry.bind("<KeyRelease>", self._on_search_typed)
+        self.search_entry.bind("<Return>", lambda event: self._run_search())
+        self.search_entry.bind("<Escape>", lambda event: self.hide_search_results())
 
     def create_chat_window(self):
         self.chat_window = ctk.CTkTextbox(
@@ -89,6 +119,10 @@ class GUIManager:
         self.chat_window.tag_config("user", foreground=self.THEME["ACCENT_COLOR"])
         self.chat_window.tag_config("ai_name", foreground=self.THEME["AI_COLOR"])
         self.chat_window.tag_config("error", foreground="red")
+        self.chat_window.tag_config("search_hit", background=self.THEME["BUTTON_ACTIVE_COLOR"])
+        # More history is paged in once the user scrolls to either end
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>", "<Prior>", "<Next>"):
+            self.chat_window.bind(sequence, self._on_chat_scroll)
 
     def create_face_frame(self):
         self.face_label_frame = ctk.CTkFrame(
@@ -116,14 +150,31 @@ class GUIManager:
         )
         self.graph_frame.pack(pady=(100, 5))
         
-        self.system_monitor_fig = Figure(figsize=(3.0, 1.2), dpi=100)
-        self.system_monitor_ax = self.system_monitor_fig.add_subplot(111)
-        
-        self.system_monitor_canvas = FigureCanvasTkAgg(
-            self.system_monitor_fig, 
-            master=self.graph_frame
-        )
-        self.system_monitor_canvas_widget = self.system_monitor_canvas.get_tk_widget()
+        self.system_monitor_renderer = load_settings().get("monitor_renderer", DEFAULT_RENDERER)
+        if self.system_monitor_renderer not in MONITOR_RENDERERS:
+            self.system_monitor_renderer = DEFAULT_RENDERER
+        if self.system_monitor_renderer == "matplotlib":
+            # Imported here so the default canvas renderer never loads matplotlib
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+            self.system_monitor_fig = Figure(figsize=(3.0, 1.2), dpi=100)
+            self.system_monitor_ax = self.system_monitor_fig.add_subplot(111)
+
+            self.system_monitor_canvas = FigureCanvasTkAgg(
+                self.system_monitor_fig, 
+                master=self.graph_frame
+            )
+            self.system_monitor_canvas_widget = self.system_monitor_canvas.get_tk_widget()
+        else:
+            self.system_monitor_canvas = tk.Canvas(
+                self.graph_frame,
+                width=300,
+                height=120,
+                bg=self.THEME["BACKGROUND_COLOR"],
+                highlightthickness=0
+            )
+            self.system_monitor_canvas_widget = self.system_monitor_canvas
         self.system_monitor_canvas_widget.pack(expand=True, fill="both", padx=5, pady=5)
 
     def create_input_area(self):
@@ -137,6 +188,7 @@ class GUIManager:
         self.bottom_frame.columnconfigure(1, weight=0)
         self.bottom_frame.columnconfigure(2, weight=0)
         self.bottom_frame.columnconfigure(3, weight=0)
+        self.bottom_frame.columnconfigure(4, weight=0)
 
         self.input_field = ctk.CTkTextbox(
             master=self.bottom_frame,
@@ -154,18 +206,37 @@ class GUIManager:
         )
         self.send_button.grid(row=0, column=1, sticky="ew")
 
+        self.stop_button = ctk.CTkButton(
+            master=self.bottom_frame,
+            text="Stop",
+            **self.BUTTON_STYLE,
+            command=self.app.on_stop
+        )
+        self.stop_button.grid(row=0, column=2, padx=(10, 0), sticky="ew")
+
+        self.new_chat_button = ctk.CTkButton(
+            master=self.bottom_frame,
+            text="New Chat",
+            **self.BUTTON_STYLE,
+            command=self.app.on_new_chat
+        )
+        self.new_chat_button.grid(row=0, column=3, padx=(10, 0), sticky="ew")
+
         self.settings_button = ctk.CTkButton(
             master=self.bottom_frame,
             text="Settings",
             **self.BUTTON_STYLE,
             command=self.open_settings_menu
         )
-        self.settings_button.grid(row=0, column=3, padx=(10, 0), sticky="ew")
+        self.settings_button.grid(row=0, column=4, padx=(10, 0), sticky="ew")
 
     def _on_personality_select(self, personality_name):
         if hasattr(self.app, 'chatbot_handler'):
-            self.app.chatbot_handler.switch_personality(personality_name)
-            self.clear_chat_window()
+            self.app.on_personality_select(personality_name)
+
+    def show_model_status(self, text=""):
+        """Show a model loading message next to the personality selector"""
+        self.model_status_label.configure(text=text)
 
     def update_input_height(self, event=None):
         line_count_str = self.input_field.index("end-1c")
@@ -175,10 +246,9 @@ class GUIManager:
         self.input_field.configure(height=new_height)
 
     def get_system_monitor_components(self):
-        return {
+        components = {
+            "renderer": self.system_monitor_renderer,
             "canvas": self.system_monitor_canvas,
-            "figure": self.system_monitor_fig,
-            "ax": self.system_monitor_ax,
             "colors": {
                 "background": self.THEME["BACKGROUND_COLOR"],
                 "text": self.THEME["TEXT_COLOR"],
@@ -186,8 +256,15 @@ class GUIManager:
                 "memory": self.THEME["MEMORY_TREND_COLOR"]
             }
         }
+        if self.system_monitor_renderer == "matplotlib":
+            components["figure"] = self.system_monitor_fig
+            components["ax"] = self.system_monitor_ax
+        return components
 
     def update_system_monitor_colors(self, theme_data):
+        if self.system_monitor_renderer != "matplotlib":
+            self.system_monitor_canvas.configure(bg=theme_data["BACKGROUND_COLOR"])
+            return
         self.system_monitor_ax.set_facecolor(theme_data["BACKGROUND_COLOR"])
         self.system_monitor_fig.patch.set_facecolor(theme_data["BACKGROUND_COLOR"])
         self.system_monitor_canvas.draw()
@@ -211,9 +288,20 @@ class GUIManager:
             dropdown_text_color=self.THEME["TEXT_COLOR"]
         )
         
+        self.model_status_label.configure(text_color=self.THEME["TEXT_COLOR"])
         self.chat_window.configure(**self.TEXTBOX_STYLE)
         self.chat_window.tag_config("user", foreground=self.THEME["ACCENT_COLOR"])
         self.chat_window.tag_config("ai_name", foreground=self.THEME["AI_COLOR"])
+        self.chat_window.tag_config("search_hit", background=self.THEME["BUTTON_ACTIVE_COLOR"])
+        self.search_entry.configure(
+            fg_color=self.THEME["INPUT_BG_COLOR"],
+            border_color=self.THEME["BUTTON_ACTIVE_COLOR"],
+            text_color=self.THEME["TEXT_COLOR"]
+        )
+        if self.search_popup is not None:
+            # Rebuilt with the new colors on the next search
+            self.search_popup.destroy()
+            self.search_popup = None
         
         self.face_label_frame.configure(fg_color=self.THEME["BACKGROUND_COLOR"])
         self.animation_canvas.configure(bg=self.THEME["BACKGROUND_COLOR"])
@@ -222,6 +310,8 @@ class GUIManager:
         
         self.input_field.configure(**self.INPUT_TEXTBOX_STYLE)
         self.send_button.configure(**self.BUTTON_STYLE)
+        self.stop_button.configure(**self.BUTTON_STYLE)
+        self.new_chat_button.configure(**self.BUTTON_STYLE)
         self.settings_button.configure(**self.BUTTON_STYLE)
         
         self.update_system_monitor_colors(theme_data)
@@ -244,6 +334,75 @@ class GUIManager:
         self.chat_window.configure(state="disabled")
         self.chat_window.see("end")
 
+    def append_chat_segments(self, segments, scroll=True):
+        """Insert several (text, tag) runs with a single state flip and scroll"""
+        self.chat_window.configure(state="normal")
+        for message, tag in segments:
+            self.chat_window.insert("end", message, tag if tag else "")
+        self.chat_window.configure(state="disabled")
+        if scroll:
+            self.chat_window.see("end")
+
+    def prepend_chat_segments(self, segments):
+        """Insert older (text, tag) runs above the transcript, keeping the current view in place"""
+        self.chat_window.configure(state="normal")
+        # A right-gravity mark advances past each insert, so runs stay in order
+        # and it ends up on the line that used to be at the top
+        self.chat_window.mark_set("history_top", "1.0")
+        self.chat_window.mark_gravity("history_top", "right")
+        for message, tag in segments:
+            self.chat_window.insert("history_top", message, tag if tag else "")
+        self.chat_window.configure(state="disabled")
+        self.chat_window.yview("history_top")
+        self.chat_window.mark_unset("history_top")
+
+    def _on_chat_scroll(self, event=None):
+        # Check after Tk has applied the scroll itself
+        self.root.after_idle(self._check_history_edges)
+
+    def _check_history_edges(self):
+        top, bottom = self.chat_window.yview()
+        if top <= 0.0:
+            self.app.on_history_top()
+        elif bottom >= 1.0:
+            self.app.on_history_bottom()
+
+    def show_search_hit(self):
+        """Scroll the highlighted search result into view"""
+        ranges = self.chat_window.tag_ranges("search_hit")
+        if ranges:
+            self.chat_window.yview(ranges[0])
+
+    def _on_search_typed(self, event=None):
+        if event is not None and event.keysym in ("Return", "Escape"):
+            return
+        # Wait for a pause in typing instead of querying on every key
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(200, self._run_search)
+
+    def _run_search(self):
+        self._search_after_id = None
+        query = self.search_entry.get().strip()
+        if query:
+            self.app.on_search(query)
+        else:
+            self.hide_search_results()
+
+    def show_search_results(self, results, ai_name):
+        if self.search_popup is None or not self.search_popup.winfo_exists():
+            self.search_popup = SearchResultsPopup(
+                self.root,
+                anchor_widget=self.search_entry,
+                theme_data=self.THEME,
+                on_select=self.app.on_search_result_selected
+            )
+        self.search_popup.show_results(results, ai_name)
+
+    def hide_search_results(self):
+        if self.search_popup is not None and self.search_popup.winfo_exists():
+            self.search_popup.withdraw()
+
     def open_settings_menu(self):
         if self.settings_window and self.settings_window.winfo_exists():
             self.settings_window.lift()
@@ -0,0 +1,175 @@
+import json
+import math
+import threading
+from pathlib import Path
+import numpy as np
+
+HISTORY_DIR = "monitor_history"
+RAW_SECONDS = 3600
+MINUTE_ROWS = 60 * 24 * 7
+HOUR_ROWS = 24 * 90
+ROLLUPS = (("minute", 60, MINUTE_ROWS), ("hour", 3600, HOUR_ROWS))
+
+class MetricRing:
+    """Fixed-size ring of timestamped float32 rows, optionally memory-mapped to disk.
+
+    Rows are stored sample-major so appending one sample writes one
+    contiguous row. On reopening, the newest timestamp marks where writing
+    left off. Timestamps only ever increase: a sample older than the newest
+    one (the wall clock stepped back) is dropped, which keeps both that
+    and the binary search in snapshot() valid.
+    """
+
+    def __init__(self, series_count, capacity, path=None):
+        self.capacity = capacity
+        if path is None:
+            self.times = np.zeros(capacity, dtype=np.float64)
+            self.values = np.zeros((capacity, series_count), dtype=np.float32)
+        else:
+            self.times = _open_map(Path(f"{path}.times"), np.float64, (capacity,))
+            self.values = _open_map(Path(f"{path}.values"), np.float32, (capacity, series_count))
+        self.stored = int(np.count_nonzero(self.times))
+        self.head = (int(np.argmax(self.times)) + 1) % capacity if self.stored else 0
+        self.last_time = float(self.times.max()) if self.stored else 0.0
+
+    def append(self, timestamp, row):
+        """Store a row, returning False if it was dropped for being out of order"""
+        if timestamp <= self.last_time:
+            return False
+        self.last_time = timestamp
+        self.times[self.head] = timestamp
+        self.values[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.stored = min(self.stored + 1, self.capacity)
+        return True
+
+    def snapshot(self, since=None):
+        """Return (times, values) oldest first, values as one row per series"""
+        order = (np.arange(self.stored) + self.head - self.stored) % self.capacity
+        if since is not None and self.stored:
+            # Timestamps increase along the ring order, so the cut is a binary search
+            order = order[np.searchsorted(self.times[order], since, side="right"):]
+        return self.times[order], self.values[order].T
+
+    def flush(self):
+        if isinstance(self.times, np.memmap):
+            self.times.flush()
+            self.values.flush()
+
+class MetricHistory:
+    """Rolling on-disk metric history at raw, 1-minute and 1-hour resolution.
+
+    Raw samples cover the last RAW_SECONDS; the minute and hour rings hold
+    the means of each completed minute and hour for a week and three months.
+    Every ring is a fixed-size memory-mapped file, so the history survives
+    restarts without ever growing.
+    """
+
+    def __init__(self, series, interval, directory=HISTORY_DIR, raw_seconds=RAW_SECONDS):
+        self.series = list(series)
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self._check_layout()
+        count = len(self.series)
+        self.rings = {"raw": self._ring("raw", math.ceil(raw_seconds / interval))}
+        self.spans = {"raw": raw_seconds}
+        self._buckets = {}
+        for name, seconds, rows in ROLLUPS:
+            self.rings[name] = self._ring(name, rows)
+            self.spans[name] = seconds * rows
+            self._buckets[name] = [None, np.zeros(count, dtype=np.float64), 0]
+
+    def _ring(self, name, capacity):
+        path = self.directory / name if self.directory is not None else None
+        return MetricRing(len(self.series), capacity, path)
+
+    def _check_layout(self):
+        """Start over if the stored files were written for other series, e.g. a different core count"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / "series.json"
+        try:
+            stored = json.loads(meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            stored = None
+        if stored != self.series:
+            for path in self.directory.glob("*.times"):
+                path.unlink()
+            for path in self.directory.glob("*.values"):
+                path.unlink()
+            meta_path.write_text(json.dumps(self.series))
+
+    def append(self, timestamp, row):
+        with self._lock:
+            if self.rings["raw"].append(timestamp, row):
+                self._roll(0, timestamp, row)
+
+    def _roll(self, level, timestamp, row):
+        if level == len(ROLLUPS):
+            return
+        name, seconds, _ = ROLLUPS[level]
+        bucket = self._buckets[name]
+        bucket_id = int(timestamp // seconds)
+        if bucket[0] is not None and bucket_id != bucket[0] and bucket[2]:
+            mean = (bucket[1] / bucket[2]).astype(np.float32)
+            self.rings[name].append((bucket[0] + 0.5) * seconds, mean)
+            if level == 0:
+                # Once a minute is often enough to push the raw pages to disk
+                self.rings["raw"].flush()
+            self.rings[name].flush()
+            self._roll(level + 1, (bucket[0] + 0.5) * seconds, mean)
+            bucket[1][:] = 0
+            bucket[2] = 0
+        bucket[0] = bucket_id
+        bucket[1] += row
+        bucket[2] += 1
+
+    def snapshot(self, seconds, now):
+        """Return (times, values) of the finest resolution that spans the last seconds"""
+        name = next((name for name in self.rings if self.spans[name] >= seconds), "hour")
+        with self._lock:
+            return self.rings[name].snapshot(since=now - seconds)
+
+    def close(self):
+        with self._lock:
+            for ring in self.rings.values():
+                ring.flush()
+
+def lttb(times, values, threshold):
+    """Downsample each row of values to threshold points with Largest-Triangle-Three-Buckets.
+
+    The rows share one time axis, so each bucket is handled for all of them
+    at once. Returns (times, values) arrays of shape (rows, threshold).
+    """
+    count = len(times)
+    rows = np.arange(values.shape[0])
+    if count <= threshold or threshold < 3:
+        return np.broadcast_to(times, values.shape), values
+    # Bucket i spans edges[i]:edges[i + 1]; the first and last points are always kept
+    edges = (np.arange(threshold - 1) * ((count - 2) / (threshold - 2))).astype(np.intp) + 1
+    edges[-1] = count - 1
+    picked = np.empty((len(rows), threshold), dtype=np.intp)
+    picked[:, 0] = 0
+    picked[:, -1] = count - 1
+    previous = picked[:, 0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = times[end:edges[i + 2]].mean()
+            next_y = values[:, end:edges[i + 2]].mean(axis=1)
+        else:
+            next_x, next_y = times[-1], values[:, -1]
+        prev_x = times[previous][:, None]
+        prev_y = values[rows, previous][:, None]
+        area = np.abs(
+            (prev_x - next_x) * (values[:, start:end] - prev_y)
+            - (prev_x - times[start:end]) * (next_y[:, None] - prev_y)
+        )
+        previous = start + np.argmax(area, axis=1)
+        picked[:, i + 1] = previous
+    return times[picked], values[rows[:, None], picked]
+
+def _open_map(path, dtype, shape):
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    mode = "r+" if path.exists() and path.stat().st_size == size else "w+"
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
@@ -0,0 +1,145 @@
+import threading
+import time
+import numpy as np
+import psutil
+from .metric_history import MetricHistory, HISTORY_DIR
+
+SAMPLE_INTERVAL_SECONDS = 0.25
+PROCESS_SCAN_SECONDS = 5
+OLLAMA_PROCESS_PREFIX = "ollama"
+MB = 1024 * 1024
+# Per-core series ("core0", "core1", ...) are appended after these
+SERIES = (
+    "cpu", "load", "memory", "swap",
+    "disk_read", "disk_write", "net_recv", "net_sent",
+    "ollama_cpu", "ollama_memory", "ollama_thread"
+)
+SERIES_UNITS = {
+    "disk_read": "MB/s",
+    "disk_write": "MB/s",
+    "net_recv": "MB/s",
+    "net_sent": "MB/s"
+}
+
+class MetricSampler:
+    """Samples system metrics on a background thread into a MetricHistory.
+
+    Each sample is a timestamp plus one float32 per series, written in
+    place into preallocated rings, so sampling never allocates and readers
+    take a consistent copy of a time window with snapshot(). Series are percentages unless
+    SERIES_UNITS says otherwise: load is the 1-minute load average as a
+    share of the cores, ollama_cpu and ollama_memory are the Ollama server
+    and runner processes' share of the machine, and ollama_thread is their
+    busiest thread as a share of one core.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL_SECONDS, directory=HISTORY_DIR):
+        self.interval = interval
+        self.core_count = psutil.cpu_count() or 1
+        self.memory_total = psutil.virtual_memory().total
+        self.series = SERIES + tuple(f"core{i}" for i in range(self.core_count))
+        self.index = {name: i for i, name in enumerate(self.series)}
+        self.row = np.zeros(len(self.series), dtype=np.float32)
+        self.history = MetricHistory(self.series, interval, directory)
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_sample = None
+        self._last_io = None
+        self._processes = {}
+        self._thread_times = {}
+        self._last_process_scan = 0.0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            # The first cpu_percent() call only sets the baseline
+            psutil.cpu_percent(percpu=True)
+            self._thread = threading.Thread(target=self._run, name="metric-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.history.close()
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling system metrics: {e}")
+            # Keep a fixed cadence however long sampling itself took
+            next_sample += self.interval
+            self._stopped.wait(max(0.0, next_sample - time.monotonic()))
+
+    def sample(self):
+        """Take one sample of every series"""
+        now = time.monotonic()
+        elapsed = now - self._last_sample if self._last_sample is not None else None
+        self._last_sample = now
+        row, index = self.row, self.index
+
+        cores = psutil.cpu_percent(percpu=True)
+        row[index["core0"]:index["core0"] + len(cores)] = cores
+        row[index["cpu"]] = sum(cores) / len(cores)
+        row[index["load"]] = psutil.getloadavg()[0] / self.core_count * 100
+        row[index["memory"]] = psutil.virtual_memory().percent
+        row[index["swap"]] = psutil.swap_memory().percent
+        self._sample_io(row, elapsed)
+        self._sample_ollama(row, elapsed, now)
+
+        self.history.append(time.time(), row)
+
+    def _sample_io(self, row, elapsed):
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        counters = (
+            disk.read_bytes if disk else 0,
+            disk.write_bytes if disk else 0,
+            net.bytes_recv if net else 0,
+            net.bytes_sent if net else 0
+        )
+        names = ("disk_read", "disk_write", "net_recv", "net_sent")
+        for name, value, last in zip(names, counters, self._last_io or counters):
+            # Counters can wrap or reset; a negative delta is not a rate
+            row[self.index[name]] = max(0, value - last) / MB / elapsed if elapsed else 0.0
+        self._last_io = counters
+
+    def _sample_ollama(self, row, elapsed, now):
+        if now - self._last_process_scan >= PROCESS_SCAN_SECONDS:
+            self._last_process_scan = now
+            self._scan_processes()
+        cpu = rss = busiest = 0.0
+        thread_times = {}
+        for pid, process in list(self._processes.items()):
+            try:
+                # oneshot() reads /proc/<pid>/stat and friends once for all calls below
+                with process.oneshot():
+                    cpu += process.cpu_percent()
+                    rss += process.memory_info().rss
+                    for thread in process.threads():
+                        key = (pid, thread.id)
+                        thread_times[key] = thread.user_time + thread.system_time
+                        if elapsed and key in self._thread_times:
+                            busiest = max(busiest, (thread_times[key] - self._thread_times[key]) / elapsed * 100)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                del self._processes[pid]
+        self._thread_times = thread_times
+        row[self.index["ollama_cpu"]] = cpu / self.core_count
+        row[self.index["ollama_memory"]] = rss / self.memory_total * 100
+        row[self.index["ollama_thread"]] = min(busiest, 100.0)
+
+    def _scan_processes(self):
+        """Find the Ollama server and runner processes, keeping known ones for cpu_percent()"""
+        found = {}
+        for process in psutil.process_iter(["name"]):
+            name = (process.info["name"] or "").lower()
+            if name.startswith(OLLAMA_PROCESS_PREFIX):
+                found[process.pid] = self._processes.get(process.pid, process)
+        self._processes = found
+
+    def snapshot(self, seconds):
+        """Return (times, values) covering the last seconds, one row of values per series"""
+        return self.history.snapshot(seconds, time.time())
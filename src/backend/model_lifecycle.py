@@ -0,0 +1,140 @@
+import threading
+import time
+
+IDLE_UNLOAD_SECONDS = 600
+KEEP_ALIVE_MARGIN_SECONDS = 60
+PRELOAD_THROTTLE_SECONDS = 5
+
+class ModelLifecycle:
+    """Loads models ahead of use and unloads them after an idle period.
+
+    Loads are empty generate calls with keep_alive, so they cost nothing
+    but the load itself; every load and unload is timed and published as
+    a MODEL_LIFECYCLE event.
+    """
+
+    def __init__(self, client, event_manager=None, idle_unload_seconds=IDLE_UNLOAD_SECONDS):
+        self.client = client
+        self.event_manager = event_manager
+        self.idle_unload_seconds = idle_unload_seconds
+        self.timings = []
+        self._last_used = {}
+        self._loading = {}
+        self._last_preload = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def keep_alive(self):
+        """keep_alive to send with requests; outlives our own idle timer"""
+        if not self.idle_unload_seconds:
+            return -1
+        return f"{int(self.idle_unload_seconds + KEEP_ALIVE_MARGIN_SECONDS)}s"
+
+    def is_loaded(self, model):
+        return model in self._last_used
+
+    def preload(self, model, options=None):
+        """Load model on a background thread, returning the thread (or None)"""
+        with self._lock:
+            if model in self._last_used or model in self._loading:
+                return None
+            thread = threading.Thread(target=self._load, args=(model, options), daemon=True)
+            self._loading[model] = thread
+        thread.start()
+        return thread
+
+    def ensure_loaded(self, model, options=None):
+        """Cheap to call on every key press: reloads at most every few seconds"""
+        now = time.monotonic()
+        if now - self._last_preload.get(model, 0) < PRELOAD_THROTTLE_SECONDS:
+            return None
+        self._last_preload[model] = now
+        return self.preload(model, options)
+
+    def wait_until_loaded(self, model, timeout=None):
+        thread = self._loading.get(model)
+        if thread is not None:
+            thread.join(timeout)
+        return self.is_loaded(model)
+
+    def note_activity(self, model):
+        """Record that model just served a request and restart its idle clock"""
+        with self._lock:
+            self._last_used[model] = time.monotonic()
+        self._schedule_idle_check()
+
+    def unload(self, model, timeout=None):
+        with self._lock:
+            self._last_used.pop(model, None)
+        started = time.perf_counter()
+        try:
+            self.client.unload(model, timeout=timeout)
+        except Exception as e:
+            print(f"Error unloading model {model}: {e}")
+            return False
+        self._report(model, "unload", time.perf_counter() - started)
+        return True
+
+    def unload_async(self, model):
+        thread = threading.Thread(target=self.unload, args=(model,), daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self, timeout=2.0, keep=()):
+        """Unload every model we used except keep, without blocking for more than timeout"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        threads = [
+            threading.Thread(target=self.unload, args=(model, (1, timeout)), daemon=True)
+            for model in list(self._last_used) if model not in keep
+        ]
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    def _load(self, model, options):
+        started = time.perf_counter()
+        try:
+            result = self.client.warm(model, keep_alive=self.keep_alive, options=options)
+        except Exception as e:
+            print(f"Error preloading model {model}: {e}")
+            return
+        finally:
+            with self._lock:
+                self._loading.pop(model, None)
+        self._report(model, "load", time.perf_counter() - started, result.get("load_duration"))
+        self.note_activity(model)
+
+    def _schedule_idle_check(self):
+        if not self.idle_unload_seconds:
+            return
+        with self._lock:
+            if not self._last_used:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            expires = min(self._last_used.values()) + self.idle_unload_seconds
+            self._timer = threading.Timer(max(0.0, expires - time.monotonic()), self._unload_idle)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _unload_idle(self):
+        now = time.monotonic()
+        idle = [model for model, used in list(self._last_used.items())
+                if now - used >= self.idle_unload_seconds]
+        for model in idle:
+            self.unload(model)
+        self._schedule_idle_check()
+
+    def _report(self, model, action, seconds, load_duration=None):
+        timing = {"model": model, "action": action, "seconds": round(seconds, 3)}
+        if load_duration:
+            timing["ollama_load_seconds"] = round(load_duration / 1e9, 3)
+        self.timings.append(timing)
+        print(f"Model {action}: {model} in {seconds:.2f}s")
+        if self.event_manager is not None:
+            self.event_manager.publish("MODEL_LIFECYCLE", timing)
@@ -0,0 +1,298 @@
+import numpy as np
+
+MONITOR_RENDERERS = ("canvas", "matplotlib")
+DEFAULT_RENDERER = "canvas"
+# Plot area as fractions of the graph, matching the matplotlib subplot layout
+PLOT_LEFT = 0.15
+PLOT_RIGHT = 0.95
+PLOT_BOTTOM = 0.25
+PLOT_TOP = 0.85
+GRID_ALPHA = 0.1
+LEGEND_COLUMN_WIDTH = 62
+
+class MatplotlibRenderer:
+    """Draws the monitor on a matplotlib figure with blitting.
+
+    Animated line artists are left out of full draws; every full draw
+    (resize, rebuild()) caches the background and draw_lines() only
+    restores it and blits the lines on top.
+    """
+
+    def __init__(self, monitor, gui_components):
+        self.monitor = monitor
+        self.canvas = gui_components["canvas"]
+        self.fig = gui_components["figure"]
+        self.ax = gui_components["ax"]
+        self.widget = self.canvas.get_tk_widget()
+        self.background = None
+        self.legend = None
+        self.lines = {}
+        for name, count in monitor.line_counts().items():
+            self.lines[name] = [
+                self.ax.plot([], [], linewidth=1.0, animated=True, visible=False)[0]
+                for _ in range(count)
+            ]
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("button_press_event", lambda event: monitor.cycle_window())
+        # Scrolling up zooms in to a shorter window
+        self.canvas.mpl_connect("scroll_event", lambda event: monitor.zoom(-1 if event.button == "up" else 1))
+
+    def rebuild(self):
+        """Restyle everything from the monitor's state and do one full draw"""
+        monitor = self.monitor
+        for name, lines in self.lines.items():
+            for line in lines:
+                line.set_color(monitor.color(name))
+                line.set_alpha(monitor.alpha(name))
+                line.set_visible(name in monitor.selected)
+        self.visible_lines = [line for name in monitor.selected for line in self.lines[name]]
+        if self.legend is not None:
+            self.legend.remove()
+        self.legend = self.ax.legend(
+            [self.lines[name][0] for name in monitor.selected],
+            [monitor.label(name) for name in monitor.selected],
+            loc="upper right",
+            fontsize=6,
+            ncol=2 if len(monitor.selected) > 3 else 1,
+            frameon=False,
+            labelcolor=monitor.colors["text"],
+            handlelength=1.0,
+            handletextpad=0.4,
+            borderpad=0.2,
+            borderaxespad=0.2
+        )
+        self.ax.set_ylim(0, monitor.y_top)
+        self._update_plot_style()
+        self.canvas.draw()
+
+    def draw_lines(self):
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_lines()
+        self.canvas.blit(self.ax.bbox)
+
+    def _on_draw(self, event=None):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line, x_values, y_values in zip(self.visible_lines, self.monitor.trend_x, self.monitor.trend_y):
+            line.set_data(x_values, y_values)
+            self.ax.draw_artist(line)
+
+    def _update_plot_style(self):
+        """Configure plot styling and appearance"""
+        colors = self.monitor.colors
+
+        # Configure spine appearance
+        for spine in self.ax.spines.values():
+            spine.set_color(colors["text"])
+            spine.set_linewidth(0.8)
+
+        self.ax.spines['top'].set_visible(False)
+        self.ax.spines['right'].set_visible(False)
+
+        # Configure axis appearance
+        self.ax.tick_params(
+            axis='both',
+            colors=colors["text"],
+            labelsize=6,
+            width=0.8,
+            length=3,
+            direction='out'
+        )
+
+        # Set axis limits and labels
+        seconds = self.monitor.window_seconds()
+        ticks, labels = self.monitor.x_ticks()
+        self.ax.set_xlim(-seconds, 0)
+        self.ax.set_xticks(ticks, labels=labels)
+        
+        self.ax.set_ylabel(
+            self.monitor.y_label, 
+            color=colors["text"], 
+            fontsize=6,
+            labelpad=2
+        )
+        
+        self.ax.set_xlabel(
+            "Time",
+            color=colors["text"],
+            fontsize=6,
+            labelpad=2
+        )
+        
+        # Configure title
+        self.ax.set_title(
+            self.monitor.title(),
+            fontsize=8,
+            fontweight="bold",
+            color=colors["text"],
+            pad=2
+        )
+
+        # Adjust subplot layout
+        self.fig.subplots_adjust(
+            left=PLOT_LEFT,
+            right=PLOT_RIGHT,
+            bottom=PLOT_BOTTOM,
+            top=PLOT_TOP
+        )
+        
+        # Set background colors
+        self.ax.set_facecolor(colors["background"])
+        self.fig.patch.set_facecolor(colors["background"])
+        
+        # Add grid
+        self.ax.grid(
+            True,
+            linestyle=':',
+            alpha=GRID_ALPHA,
+            color=colors["text"]
+        )
+
+class CanvasRenderer:
+    """Draws the monitor on a plain tk.Canvas, without matplotlib.
+
+    Every series keeps persistent polyline items that draw_lines() moves
+    with coords(), so a tick touches only the visible lines. Axes, ticks,
+    labels and the legend are recreated by rebuild(), which runs when the
+    canvas is resized, the theme or selection changes or the y axis
+    rescales. Tk has no alpha, so translucent colors are blended with the
+    background instead.
+    """
+
+    def __init__(self, monitor, gui_components):
+        self.monitor = monitor
+        self.canvas = gui_components["canvas"]
+        self.widget = self.canvas
+        self.size = None
+        # Gaps in the data split a line into segments, each its own item
+        self.lines = {name: [[] for _ in range(count)] for name, count in monitor.line_counts().items()}
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.canvas.bind("<Button-1>", lambda event: monitor.cycle_window())
+        self.canvas.bind("<MouseWheel>", lambda event: monitor.zoom(-1 if event.delta > 0 else 1))
+        self.canvas.bind("<Button-4>", lambda event: monitor.zoom(-1))
+        self.canvas.bind("<Button-5>", lambda event: monitor.zoom(1))
+
+    def _on_resize(self, event):
+        if (event.width, event.height) != self.size:
+            self.rebuild()
+
+    def _plot_area(self):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            # Not mapped yet; lay out for the requested size
+            width = int(self.canvas.cget("width"))
+            height = int(self.canvas.cget("height"))
+        self.size = (width, height)
+        return (
+            width * PLOT_LEFT,
+            height * (1 - PLOT_TOP),
+            width * PLOT_RIGHT,
+            height * (1 - PLOT_BOTTOM)
+        )
+
+    def rebuild(self):
+        """Recreate the axes from the monitor's state and redraw the lines"""
+        monitor = self.monitor
+        colors = monitor.colors
+        text = colors["text"]
+        canvas = self.canvas
+        canvas.configure(bg=colors["background"])
+        canvas.delete("axes")
+        left, top, right, bottom = self.area = self._plot_area()
+        width, height = self.size
+        font = ("TkDefaultFont", 6)
+
+        # Grid and y ticks at 0, half and the top of the axis
+        grid = self._blend(text, colors["background"], GRID_ALPHA)
+        for fraction in (0.0, 0.5, 1.0):
+            y = bottom - fraction * (bottom - top)
+            canvas.create_line(left, y, right, y, fill=grid, dash=(1, 2), tags="axes")
+            canvas.create_line(left - 3, y, left, y, fill=text, tags="axes")
+            canvas.create_text(left - 5, y, text=f"{fraction * monitor.y_top:g}",
+                               anchor="e", fill=text, font=font, tags="axes")
+
+        seconds = monitor.window_seconds()
+        for tick, label in zip(*monitor.x_ticks()):
+            x = left + (tick + seconds) / seconds * (right - left)
+            canvas.create_line(x, top, x, bottom, fill=grid, dash=(1, 2), tags="axes")
+            canvas.create_line(x, bottom, x, bottom + 3, fill=text, tags="axes")
+            canvas.create_text(x, bottom + 4, text=label, anchor="n", fill=text, font=font, tags="axes")
+
+        canvas.create_line(left, top, left, bottom, right, bottom, fill=text, tags="axes")
+        canvas.create_text((left + right) / 2, height - 2, text="Time",
+                           anchor="s", fill=text, font=font, tags="axes")
+        canvas.create_text(2, (top + bottom) / 2, text=monitor.y_label, angle=90,
+                           anchor="n", fill=text, font=font, tags="axes")
+        canvas.create_text((left + right) / 2, top - 2, text=monitor.title(),
+                           anchor="s", fill=text, font=("TkDefaultFont", 8, "bold"), tags="axes")
+
+        # Legend in the upper right corner, filled row by row like matplotlib's
+        columns = 2 if len(monitor.selected) > 3 else 1
+        for position, name in enumerate(monitor.selected):
+            x = right - (columns - position % columns) * LEGEND_COLUMN_WIDTH
+            y = top + 5 + (position // columns) * 8
+            canvas.create_line(x, y, x + 10, y, fill=self._line_color(name), width=1, tags="axes")
+            canvas.create_text(x + 13, y, text=monitor.label(name), anchor="w",
+                               fill=text, font=font, tags="axes")
+
+        for name, rows in self.lines.items():
+            for items in rows:
+                for item in items:
+                    canvas.itemconfigure(item, fill=self._line_color(name))
+        self._hide_unselected()
+        canvas.tag_lower("axes")
+        self.draw_lines()
+
+    def _hide_unselected(self):
+        for name, rows in self.lines.items():
+            if name not in self.monitor.selected:
+                for items in rows:
+                    self._show_segments(items, 0)
+
+    def draw_lines(self):
+        monitor = self.monitor
+        left, top, right, bottom = self.area
+        seconds = monitor.window_seconds()
+        x_scale = (right - left) / seconds
+        y_scale = (bottom - top) / monitor.y_top
+        rows = [(name, items) for name in monitor.selected for items in self.lines[name]]
+        for (name, items), x_values, y_values in zip(rows, monitor.trend_x, monitor.trend_y):
+            points = np.column_stack((
+                left + (x_values + seconds) * x_scale,
+                bottom - np.minimum(y_values, monitor.y_top) * y_scale
+            ))
+            segments = []
+            for segment in np.split(points, np.flatnonzero(np.isnan(points[:, 1]))):
+                segment = segment[~np.isnan(segment[:, 1])]
+                if len(segment):
+                    segments.append(segment)
+            while len(items) < len(segments):
+                items.append(self.canvas.create_line(0, 0, 0, 0, fill=self._line_color(name), width=1, tags="series"))
+            for item, segment in zip(items, segments):
+                if len(segment) == 1:
+                    segment = np.repeat(segment, 2, axis=0)
+                self.canvas.coords(item, segment.ravel().tolist())
+            self._show_segments(items, len(segments))
+
+    def _show_segments(self, items, count):
+        for position, item in enumerate(items):
+            state = "normal" if position < count else "hidden"
+            if self.canvas.itemcget(item, "state") != state:
+                self.canvas.itemconfigure(item, state=state)
+
+    def _line_color(self, name):
+        color = self.monitor.color(name)
+        alpha = self.monitor.alpha(name)
+        return color if alpha is None else self._blend(color, self.monitor.colors["background"], alpha)
+
+    def _blend(self, color, background, alpha):
+        # winfo_rgb understands every Tk color spec and returns 16-bit channels
+        front = self.canvas.winfo_rgb(color)
+        back = self.canvas.winfo_rgb(background)
+        return "#" + "".join(f"{int((f * alpha + b * (1 - alpha)) / 257):02x}" for f, b in zip(front, back))
@@ -0,0 +1,125 @@
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .settings_manager import load_settings
+from .stream_capture import StreamRecorder
+
+OLLAMA_API_BASE = "http://localhost:11434/api"
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 300
+CONNECT_RETRIES = 3
+RETRY_BACKOFF = 0.3
+POOL_SIZE = 4
+
+class OllamaClient:
+    """Shared keep-alive HTTP transport for every call made to Ollama"""
+
+    def __init__(self, api_base=None, connect_timeout=None, read_timeout=None,
+                 retries=None, backoff=None, pool_size=None, record_dir=None):
+        settings = load_settings()
+        # record_dir=False turns recording off whatever the settings say
+        if record_dir is None:
+            record_dir = settings.get("record_streams_dir")
+        self.recorder = StreamRecorder(record_dir) if record_dir else None
+        self.api_base = (api_base or settings.get("ollama_api_base", OLLAMA_API_BASE)).rstrip("/")
+        self.timeout = (
+            connect_timeout or settings.get("ollama_connect_timeout", CONNECT_TIMEOUT),
+            read_timeout or settings.get("ollama_read_timeout", READ_TIMEOUT)
+        )
+        self.session = self._create_session(
+            CONNECT_RETRIES if retries is None else retries,
+            RETRY_BACKOFF if backoff is None else backoff,
+            pool_size or POOL_SIZE
+        )
+
+    def _create_session(self, retries, backoff, pool_size):
+        """Build a pooled session that only retries failed connection attempts"""
+        # Generation is not idempotent on the server side, so reads and
+        # error statuses are never retried, only refused/unreachable connects.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=backoff,
+            allowed_methods=None,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _post(self, endpoint, payload, stream=False, timeout=None):
+        response = self.session.post(
+            f"{self.api_base}/{endpoint}",
+            json=payload,
+            stream=stream,
+            timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        return response
+
+    def _post_stream(self, endpoint, payload, stream):
+        response = self._post(endpoint, payload, stream=stream)
+        if stream and self.recorder is not None:
+            response = self.recorder.wrap(response, payload)
+        return response
+
+    def generate(self, payload, stream=True):
+        """POST to /api/generate, returning the (optionally streaming) response"""
+        return self._post_stream("generate", payload, stream)
+
+    def chat(self, payload, stream=True):
+        """POST to /api/chat, returning the (optionally streaming) response"""
+        return self._post_stream("chat", payload, stream)
+
+    def iter_stream(self, response):
+        """Yield decoded NDJSON objects from a streaming response"""
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
+
+    def embed(self, model, inputs):
+        """Return one embedding vector per input string"""
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        response = self._post("embed", {"model": model, "input": list(inputs)})
+        return response.json()["embeddings"]
+
+    def warm(self, model, keep_alive=None, options=None):
+        """Load a model with an empty generate, returning Ollama's final object"""
+        payload = {"model": model, "prompt": "", "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        if options:
+            # Must match the options used for chatting or Ollama reloads the model
+            payload["options"] = options
+        return self._post("generate", payload).json()
+
+    def unload(self, model, timeout=None):
+        """Ask Ollama to drop a model from memory immediately"""
+        payload = {"model": model, "prompt": "", "stream": False, "keep_alive": 0}
+        return self._post("generate", payload, timeout=timeout).json()
+
+    def list_models(self):
+        """Return the models installed locally, including their size on disk"""
+        response = self.session.get(f"{self.api_base}/tags", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("models", [])
+
+    def running_models(self):
+        """Return the models Ollama currently holds in memory"""
+        response = self.session.get(f"{self.api_base}/ps", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("models", [])
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,232 @@
+"""Local stand-in for the Ollama HTTP API.
+
+Serves /api/generate, /api/chat, /api/embed, /api/ps and /api/tags with
+canned NDJSON streams so the transport can be exercised without a model:
+
+    python -m backend.ollama_stub --port 11435 --rate 40
+    python -m backend.ollama_stub --replay recorded.ndjson --rate 25
+    python -m backend.ollama_stub --bench 50
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Stub reply from the local Ollama server. " * 4
+EMBEDDING_SIZE = 16
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            self._send_json({"models": [{"name": m, "model": m, "size": 0} for m in self.server.loaded_models]})
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        self.server.request_count += 1
+        payload = self._read_json()
+        if self.path == "/api/embed":
+            inputs = payload.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"model": payload.get("model"), "embeddings": [self._embed(text) for text in inputs]})
+        elif self.path in ("/api/generate", "/api/chat"):
+            self._generate(payload, chat=self.path == "/api/chat")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _embed(self, text):
+        # Deterministic bag-of-characters vector, good enough for plumbing tests
+        vector = [0.0] * EMBEDDING_SIZE
+        for i, char in enumerate(text):
+            vector[(ord(char) + i) % EMBEDDING_SIZE] += 1.0
+        return vector
+
+    def _tokens(self):
+        return self.server.reply.split(" ")
+
+    def _final(self, payload, eval_count, started):
+        return {
+            "model": payload.get("model"),
+            "done": True,
+            "done_reason": "stop",
+            "context": list(range(eval_count)),
+            "prompt_eval_count": len(str(payload.get("prompt", payload.get("messages", "")))) // 4,
+            "eval_count": eval_count,
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "load_duration": 0
+        }
+
+    def _generate(self, payload, chat=False):
+        started = time.perf_counter()
+        model = payload.get("model")
+        if payload.get("keep_alive") == 0:
+            self.server.loaded_models.discard(model)
+            self._send_json({"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+        self.server.loaded_models.add(model)
+        if not payload.get("prompt") and not chat:
+            self._send_json({"model": model, "response": "", "done": True, "done_reason": "load"})
+            return
+
+        tokens = self._tokens()
+        if not payload.get("stream", True):
+            body = {"response": " ".join(tokens)} if not chat else {"message": {"role": "assistant", "content": " ".join(tokens)}}
+            body.update(self._final(payload, len(tokens), started))
+            self._send_json(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        delay = 1.0 / self.server.token_rate if self.server.token_rate else 0
+        if self.server.replay_lines and not chat:
+            self._replay(delay)
+            return
+        try:
+            for i, token in enumerate(tokens):
+                text = token if i == len(tokens) - 1 else token + " "
+                piece = {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+                piece.update({"model": model, "done": False})
+                self._write_chunk(json.dumps(piece) + "\n")
+                if delay:
+                    time.sleep(delay)
+            final = {"message": {"role": "assistant", "content": ""}} if chat else {"response": ""}
+            final.update(self._final(payload, len(tokens), started))
+            self._write_chunk(json.dumps(final) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream, like Ollama we stop generating
+            self.close_connection = True
+
+    def _replay(self, delay):
+        # Recorded streams are sent verbatim, one NDJSON line per token
+        try:
+            for line in self.server.replay_lines:
+                self._write_chunk(line.rstrip("\n") + "\n")
+                if delay:
+                    time.sleep(delay)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+class StubOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, token_rate=0, reply=DEFAULT_REPLY, replay_lines=None):
+        super().__init__((host, port), StubOllamaHandler)
+        self.token_rate = token_rate
+        self.reply = reply
+        self.replay_lines = replay_lines
+        self.loaded_models = set()
+        self.request_count = 0
+        self._thread = None
+
+    @classmethod
+    def from_ndjson(cls, path, **kwargs):
+        """Serve the raw NDJSON stream recorded in path for every generate call"""
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        return cls(replay_lines=lines, **kwargs)
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        """Serve on a background thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def run_benchmark(requests_count, token_rate):
+    """Time sequential streamed generations through the pooled client"""
+    from .ollama_client import OllamaClient
+
+    server = StubOllamaServer(token_rate=token_rate).start()
+    client = OllamaClient(api_base=server.api_base)
+    timings = []
+    try:
+        client.warm("stub")
+        for _ in range(requests_count):
+            started = time.perf_counter()
+            response = client.generate({"model": "stub", "prompt": "ping", "stream": True})
+            first = None
+            for _ in client.iter_stream(response):
+                if first is None:
+                    first = time.perf_counter() - started
+            timings.append((first, time.perf_counter() - started))
+        client.unload("stub")
+    finally:
+        client.close()
+        server.stop()
+
+    firsts = sorted(t[0] for t in timings)
+    totals = sorted(t[1] for t in timings)
+    print(f"requests: {requests_count}")
+    print(f"first chunk p50: {firsts[len(firsts) // 2] * 1000:.2f} ms")
+    print(f"total p50: {totals[len(totals) // 2] * 1000:.2f} ms")
+    print(f"total max: {totals[-1] * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of the Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--rate", type=float, default=0, help="tokens per second, 0 for unthrottled")
+    parser.add_argument("--replay", help="NDJSON file of a recorded /api/generate stream to serve")
+    parser.add_argument("--bench", type=int, default=0, help="run N requests through OllamaClient and exit")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(args.bench, args.rate)
+        return
+
+    if args.replay:
+        server = StubOllamaServer.from_ndjson(args.replay, host=args.host, port=args.port, token_rate=args.rate)
+    else:
+        server = StubOllamaServer(args.host, args.port, token_rate=args.rate)
+    print(f"Stub Ollama listening on {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,195 @@
-import os
+import codecs
+import mmap
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from charset_normalizer import from_bytes
+from .file_tracker import FileChangeTracker, SCAN_INTERVAL_SECONDS
+
+READ_CHUNK_BYTES = 64 * 1024
+MAX_READ_BYTES = 1024 * 1024
+MAX_LINE_CHARS = 8192
+MMAP_THRESHOLD = 8 * 1024 * 1024
+ENCODING_SAMPLE_BYTES = 64 * 1024
+CACHE_BYTES = 16 * 1024 * 1024
+PREFERRED_LEGACY_ENCODING = "cp1252"
+LEGACY_CHAOS_MARGIN = 0.15
+TRUNCATED_MARKER = "\n[... truncated ...]"
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+]
 
 class ReadWriteManager:
-    def __init__(self, base_folder="ai_files"):
+    def __init__(self, base_folder="ai_files", cache_bytes=CACHE_BYTES, state_path=None):
         self.base_folder = Path(base_folder)
         if not self.base_folder.exists():
             self.base_folder.mkdir(parents=True)
+        self.tracker = FileChangeTracker(
+            self.base_folder,
+            state_path or self.base_folder.with_name(f"{self.base_folder.name}_state.json")
+        )
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._encodings = {}
+        self._lock = threading.Lock()
 
     def list_files(self):
-        """List all files in the ai_files directory."""
-        return [file.name for file in self.base_folder.glob("*") if file.is_file()]
+        """List all files under the ai_files directory, as paths relative to it."""
+        return self.tracker.files()
+
+    def watch(self, event_manager, interval=SCAN_INTERVAL_SECONDS):
+        """Publish AI_FILES_CHANGED with added/modified/removed paths as the folder changes"""
+        self.tracker.add_listener(lambda changes: event_manager.publish("AI_FILES_CHANGED", changes))
+        self.tracker.start(interval)
+
+    def stop_watching(self):
+        self.tracker.stop()
 
-    def read_file(self, filename):
-        """Read the contents of a specific file."""
+    def _path(self, filename):
         file_path = self.base_folder / filename
         if not file_path.exists() or not file_path.is_file():
+            raise FileNotFoundError(f"File '{filename}' not found.")
+        return file_path
+
+    def read_file(self, filename, max_bytes=MAX_READ_BYTES):
+        """Read the contents of a specific file, truncated after max_bytes."""
+        try:
+            file_path = self._path(filename)
+            stat = file_path.stat()
+        except (FileNotFoundError, OSError):
             return f"[Error: File '{filename}' not found.]"
-        with file_path.open("r", encoding="utf-8") as file:
-            return file.read()
+        key = (str(file_path), stat.st_mtime_ns, stat.st_size, max_bytes)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        content = "".join(self.read_range(filename, 0, max_bytes))
+        if max_bytes is not None and stat.st_size > max_bytes:
+            content += TRUNCATED_MARKER
+        self._cache_put(key, content)
+        return content
+
+    def read_chunks(self, filename, chunk_bytes=READ_CHUNK_BYTES):
+        """Yield the file's text in pieces of about chunk_bytes without loading it whole."""
+        yield from self.read_range(filename, 0, None, chunk_bytes)
+
+    def read_range(self, filename, start=0, length=None, chunk_bytes=READ_CHUNK_BYTES):
+        """Yield the text of bytes [start, start + length) in pieces of about chunk_bytes.
+
+        Large files are read through mmap so a range in the middle of a huge
+        log costs only the pages it touches.
+        """
+        file_path = self._path(filename)
+        decoder = codecs.getincrementaldecoder(self.detect_encoding(filename))(errors="replace")
+        size = file_path.stat().st_size
+        end = size if length is None else min(size, start + length)
+        with file_path.open("rb") as f:
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset in range(start, end, chunk_bytes):
+                        yield decoder.decode(mapped[offset:min(offset + chunk_bytes, end)])
+            else:
+                f.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    data = f.read(min(chunk_bytes, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    yield decoder.decode(data)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def iter_lines(self, filename, max_line_chars=MAX_LINE_CHARS):
+        """Yield the file's lines, splitting any longer than max_line_chars."""
+        pending = ""
+        for text in self.read_chunks(filename):
+            pending += text
+            lines = pending.splitlines(keepends=True)
+            # The last piece may continue in the next chunk, including a
+            # trailing "\r" whose "\n" has not been read yet
+            pending = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+            for line in lines:
+                yield from _split_line(line, max_line_chars)
+            if len(pending) > max_line_chars:
+                *complete, pending = _split_line(pending, max_line_chars)
+                yield from complete
+        if pending:
+            yield from _split_line(pending, max_line_chars)
+
+    def is_binary(self, filename):
+        """True if the file looks like binary data rather than text."""
+        with self._path(filename).open("rb") as f:
+            sample = f.read(1024)
+        if any(sample.startswith(bom) for bom, _ in BOMS):
+            return False
+        return b"\0" in sample
+
+    def detect_encoding(self, filename):
+        """Guess a file's encoding from its BOM or a sample, never decoding it all."""
+        file_path = self._path(filename)
+        stat = file_path.stat()
+        key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+        encoding = self._encodings.get(key)
+        if encoding is not None:
+            return encoding
+
+        with file_path.open("rb") as f:
+            sample = f.read(ENCODING_SAMPLE_BYTES)
+        encoding = next((name for bom, name in BOMS if sample.startswith(bom)), None)
+        if encoding is None:
+            try:
+                # Not final: the sample may end inside a multi-byte character
+                codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+                encoding = "utf-8"
+            except UnicodeDecodeError:
+                encoding = _guess_legacy_encoding(sample)
+        self._encodings[key] = encoding
+        return encoding
+
+    def cache_stats(self):
+        with self._lock:
+            return {"entries": len(self._cache), "bytes": self._cached_bytes, "limit": self.cache_bytes}
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            self._cache.move_to_end(key)
+            return entry[0]
+
+    def _cache_put(self, key, content):
+        size = len(content.encode("utf-8", errors="replace"))
+        # A single huge entry would evict everything else for little gain
+        if size > self.cache_bytes // 4:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = (content, size)
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_bytes:
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted_size
+
+def _guess_legacy_encoding(sample):
+    best = from_bytes(sample).best()
+    if best is None:
+        return "latin-1"
+    # Western code pages often tie on short samples, and the most common one
+    # may not even be listed; score it on its own and prefer it unless it
+    # reads clearly worse
+    preferred = from_bytes(sample, cp_isolation=[PREFERRED_LEGACY_ENCODING]).best()
+    if preferred is not None and preferred.chaos <= best.chaos + LEGACY_CHAOS_MARGIN:
+        return preferred.encoding
+    return best.encoding
+
+def _split_line(line, max_chars):
+    return [line[i:i + max_chars] for i in range(0, len(line), max_chars)] or [line]
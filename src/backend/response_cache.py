@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = "response_cache.sqlite3"
+MEMORY_ENTRIES = 128
+DISK_LIMIT_BYTES = 32 * 1024 * 1024
+
+def make_cache_key(model_name, system_prompt, history, user_text):
+    """Hash everything that can change the answer to user_text"""
+    normalized = " ".join(user_text.split()).lower()
+    material = json.dumps([model_name, system_prompt, [list(turn) for turn in history], normalized])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Two-level cache of generated replies: an in-memory LRU in front of a
+    size-bounded SQLite store that survives restarts."""
+
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES, disk_limit_bytes=DISK_LIMIT_BYTES):
+        self.memory_entries = memory_entries
+        self.disk_limit_bytes = disk_limit_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._db.commit()
+
+    def get(self, key, ttl=None, count=True):
+        """Return the cached reply for key, or None if missing or older than ttl.
+
+        count=False leaves the hit/miss stats alone, for lookups that are
+        not chat replies (e.g. document summary steps).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._db.execute("SELECT created, response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+            if entry is not None and ttl and now - entry[0] > ttl:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+
+            if count:
+                self.hits += 1
+            self._remember(key, entry)
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return entry[1]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._remember(key, (now, response))
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (key, response, now, now, len(response.encode("utf-8")))
+            )
+            self._enforce_disk_limit()
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            disk_entries, disk_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _delete(self, key):
+        self._memory.pop(key, None)
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._db.commit()
+
+    def _enforce_disk_limit(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.disk_limit_bytes:
+            return
+        # Evict least recently used rows until the store is back under its limit
+        excess = total - self.disk_limit_bytes
+        freed = 0
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if freed >= excess:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            freed += size
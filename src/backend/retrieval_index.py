@@ -0,0 +1,262 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from .read_write_manager import ReadWriteManager
+from .token_budget import estimate_tokens
+
+INDEX_PATH = "retrieval_index.sqlite3"
+BUILD_CACHE_KB = 64 * 1024
+CHUNK_TOKENS = 200
+COMMIT_CHUNKS = 500
+TOP_K = 4
+CONTEXT_TOKENS = 1000
+BM25_K1 = 1.2
+BM25_B = 0.75
+TERM = re.compile(r"\w{2,}")
+
+def tokenize(text):
+    return TERM.findall(text.lower())
+
+def iter_file_chunks(manager, name, chunk_tokens=CHUNK_TOKENS):
+    """Yield text chunks of about chunk_tokens, streaming the file through manager"""
+    if manager.is_binary(name):
+        return
+    lines, tokens = [], 0
+    for line in manager.iter_lines(name):
+        lines.append(line)
+        tokens += estimate_tokens(line)
+        if tokens >= chunk_tokens:
+            yield "".join(lines)
+            lines, tokens = [], 0
+    text = "".join(lines)
+    if text.strip():
+        yield text
+
+def format_context(results, token_budget=CONTEXT_TOKENS):
+    """Join search results into prompt context, skipping any that would overflow token_budget"""
+    parts = []
+    used = 0
+    for result in results:
+        snippet = f"[{result['path']}]\n{result['text']}"
+        tokens = estimate_tokens(snippet)
+        if used + tokens > token_budget:
+            continue
+        parts.append(snippet)
+        used += tokens
+    return "\n\n".join(parts)
+
+class RetrievalIndex:
+    """On-disk BM25 index over the files in ReadWriteManager's folder.
+
+    Files are split into chunks of roughly CHUNK_TOKENS and every chunk's
+    term frequencies go into a SQLite inverted index. refresh() only
+    re-indexes files whose mtime or size changed, and reads each file as a
+    stream, so memory stays bounded by one chunk however large the folder.
+    """
+
+    def __init__(self, manager=None, path=INDEX_PATH, chunk_tokens=CHUNK_TOKENS):
+        self.manager = manager or ReadWriteManager()
+        self.path = path
+        self.chunk_tokens = chunk_tokens
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._create_schema()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _create_schema(self):
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime_ns INTEGER, size INTEGER);"
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL, position INTEGER NOT NULL, "
+                "text TEXT NOT NULL, length INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS chunks_file ON chunks(file_id);"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term TEXT NOT NULL, chunk_id INTEGER NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "chunks INTEGER NOT NULL, total_length INTEGER NOT NULL);"
+                "INSERT OR IGNORE INTO stats (id, chunks, total_length) VALUES (0, 0, 0);"
+            )
+            self._db.commit()
+
+    def refresh(self):
+        """Bring the index in line with the folder, returning counts of what changed"""
+        changes = {"indexed": 0, "removed": 0, "unchanged": 0}
+        with self._refresh_lock:
+            db = self._connect()
+            db.execute(f"PRAGMA cache_size = -{BUILD_CACHE_KB}")
+            try:
+                known = {path: (file_id, mtime_ns, size)
+                         for file_id, path, mtime_ns, size in db.execute("SELECT id, path, mtime_ns, size FROM files")}
+                for name in self.manager.list_files():
+                    try:
+                        stat = (self.manager.base_folder / name).stat()
+                    except OSError:
+                        continue
+                    entry = known.pop(name, None)
+                    if entry is not None and entry[1:] == (stat.st_mtime_ns, stat.st_size):
+                        changes["unchanged"] += 1
+                        continue
+                    if entry is not None:
+                        self._remove_file(db, entry[0])
+                    self._index_file(db, name, stat)
+                    changes["indexed"] += 1
+                for file_id, _, _ in known.values():
+                    self._remove_file(db, file_id)
+                    changes["removed"] += 1
+                db.commit()
+            finally:
+                db.close()
+        return changes
+
+    def apply_changes(self, changes):
+        """Update just the files named in an AI_FILES_CHANGED event"""
+        with self._refresh_lock:
+            db = self._connect()
+            db.execute(f"PRAGMA cache_size = -{BUILD_CACHE_KB}")
+            try:
+                for name in changes.get("removed", []):
+                    if (self.manager.base_folder / name).exists():
+                        continue  # recreated since; handled as added by a later event
+                    row = db.execute("SELECT id FROM files WHERE path = ?", (name,)).fetchone()
+                    if row is not None:
+                        self._remove_file(db, row[0])
+                for name in changes.get("added", []) + changes.get("modified", []):
+                    try:
+                        stat = (self.manager.base_folder / name).stat()
+                    except OSError:
+                        continue
+                    row = db.execute("SELECT id, mtime_ns, size FROM files WHERE path = ?", (name,)).fetchone()
+                    if row is not None:
+                        if row[1:] == (stat.st_mtime_ns, stat.st_size):
+                            continue  # already picked up by refresh()
+                        self._remove_file(db, row[0])
+                    self._index_file(db, name, stat)
+                db.commit()
+            except Exception as e:
+                print(f"Error updating retrieval index: {e}")
+            finally:
+                db.close()
+
+    def refresh_async(self):
+        thread = threading.Thread(target=self._refresh_logged, daemon=True)
+        thread.start()
+        return thread
+
+    def _refresh_logged(self):
+        try:
+            changes = self.refresh()
+            if changes["indexed"] or changes["removed"]:
+                print(f"Retrieval index: {changes['indexed']} files indexed, {changes['removed']} removed")
+        except Exception as e:
+            print(f"Error refreshing retrieval index: {e}")
+
+    def _index_file(self, db, name, stat):
+        # The stat is only stored once every chunk is in, so an interrupted
+        # build is redone from scratch on the next refresh
+        file_id = db.execute(
+            "INSERT INTO files (path, mtime_ns, size) VALUES (?, NULL, NULL) "
+            "ON CONFLICT(path) DO UPDATE SET mtime_ns = NULL, size = NULL RETURNING id",
+            (name,)
+        ).fetchone()[0]
+        chunk_count = total_length = 0
+        postings = []
+        for position, text in enumerate(iter_file_chunks(self.manager, name, self.chunk_tokens)):
+            terms = Counter(tokenize(text))
+            if not terms:
+                continue
+            length = sum(terms.values())
+            chunk_id = db.execute(
+                "INSERT INTO chunks (file_id, position, text, length) VALUES (?, ?, ?, ?)",
+                (file_id, position, text, length)
+            ).lastrowid
+            postings.extend((term, chunk_id, tf) for term, tf in terms.items())
+            chunk_count += 1
+            total_length += length
+            if chunk_count == COMMIT_CHUNKS:
+                self._write_postings(db, postings, chunk_count, total_length)
+                postings, chunk_count, total_length = [], 0, 0
+                db.commit()
+        self._write_postings(db, postings, chunk_count, total_length)
+        db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", (stat.st_mtime_ns, stat.st_size, file_id))
+        db.commit()
+
+    def _write_postings(self, db, postings, chunk_count, total_length):
+        # Inserting in key order keeps the B-tree writes local instead of
+        # scattering them across every term's pages
+        postings.sort()
+        db.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+        self._update_stats(db, chunk_count, total_length)
+
+    def _remove_file(self, db, file_id):
+        chunk_count = total_length = 0
+        for chunk_id, text, length in db.execute(
+            "SELECT id, text, length FROM chunks WHERE file_id = ?", (file_id,)
+        ):
+            # Re-tokenizing finds the chunk's postings by primary key, which
+            # is much cheaper than a second index on chunk_id
+            db.executemany(
+                "DELETE FROM postings WHERE term = ? AND chunk_id = ?",
+                [(term, chunk_id) for term in set(tokenize(text))]
+            )
+            chunk_count += 1
+            total_length += length
+        db.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,))
+        db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        self._update_stats(db, -chunk_count, -total_length)
+
+    def _update_stats(self, db, chunks, total_length):
+        db.execute(
+            "UPDATE stats SET chunks = chunks + ?, total_length = total_length + ? WHERE id = 0",
+            (chunks, total_length)
+        )
+
+    def search(self, query, top_k=TOP_K):
+        """Return the top_k chunks for query as dicts with path, position, text and score"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            chunk_total, total_length = self._db.execute("SELECT chunks, total_length FROM stats").fetchone()
+            if not chunk_total:
+                return []
+            average_length = total_length / chunk_total
+            scores = Counter()
+            for term in terms:
+                postings = self._db.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log((chunk_total - df + 0.5) / (df + 0.5) + 1)
+                for chunk_id, tf, length in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            results = []
+            for chunk_id, score in scores.most_common(top_k):
+                path, position, text = self._db.execute(
+                    "SELECT f.path, c.position, c.text FROM chunks c JOIN files f ON f.id = c.file_id WHERE c.id = ?",
+                    (chunk_id,)
+                ).fetchone()
+                results.append({"path": path, "position": position, "text": text.strip(), "score": score})
+        return results
+
+    def build_context(self, query, token_budget=CONTEXT_TOKENS, top_k=TOP_K):
+        """Format the best matching chunks as prompt context that fits token_budget"""
+        return format_context(self.search(query, top_k), token_budget)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
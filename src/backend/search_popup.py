@@ -0,0 +1,61 @@
+import customtkinter as ctk
+from datetime import datetime
+
+class SearchResultsPopup(ctk.CTkToplevel):
+    """Borderless list of search hits shown under the search box"""
+
+    def __init__(self, master, anchor_widget, theme_data, on_select):
+        super().__init__(master)
+        self.anchor_widget = anchor_widget
+        self.THEME = theme_data
+        self.on_select = on_select
+        self.overrideredirect(True)
+        self.configure(fg_color=self.THEME["ACCENT_COLOR"])
+
+        self.results_frame = ctk.CTkScrollableFrame(
+            self,
+            fg_color=self.THEME["BACKGROUND_COLOR"],
+            corner_radius=0
+        )
+        self.results_frame.pack(expand=True, fill="both", padx=2, pady=2)
+        self.bind("<Escape>", lambda event: self.withdraw())
+
+    def show_results(self, results, ai_name):
+        for child in self.results_frame.winfo_children():
+            child.destroy()
+        if not results:
+            ctk.CTkLabel(
+                self.results_frame,
+                text="No matches",
+                text_color=self.THEME["TEXT_COLOR"],
+                font=self.THEME["BUTTON_STYLE"]["font"]
+            ).pack(anchor="w", padx=5, pady=5)
+        for result in results:
+            speaker = "You" if result["role"] == "User" else ai_name
+            when = datetime.fromtimestamp(result["created"]).strftime("%Y-%m-%d %H:%M")
+            ctk.CTkButton(
+                self.results_frame,
+                text=f"{when}  {speaker}: {result['snippet']}",
+                anchor="w",
+                fg_color="transparent",
+                hover_color=self.THEME["BUTTON_ACTIVE_COLOR"],
+                text_color=self.THEME["TEXT_COLOR"],
+                font=self.THEME["BUTTON_STYLE"]["font"],
+                command=lambda chosen=result: self._select(chosen)
+            ).pack(fill="x", padx=2, pady=1)
+        self._position_window()
+        self.deiconify()
+        self.lift()
+
+    def _select(self, result):
+        self.withdraw()
+        self.on_select(result)
+
+    def _position_window(self):
+        window_width = 520
+        window_height = 300
+        x_position = self.anchor_widget.winfo_rootx()
+        y_position = self.anchor_widget.winfo_rooty() + self.anchor_widget.winfo_height() + 2
+        screen_width = self.winfo_screenwidth()
+        x_position = min(max(x_position, 0), screen_width - window_width)
+        self.geometry(f"{window_width}x{window_height}+{x_position}+{y_position}")
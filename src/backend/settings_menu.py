@@ -1,5 +1,7 @@
 import customtkinter as ctk
 from .settings_manager import load_settings, save_settings
+from .monitor_renderers import MONITOR_RENDERERS, DEFAULT_RENDERER
+from .system_monitor import SERIES_LABELS, DEFAULT_SERIES
 from .theme_manager import ThemeManager
 
 class SettingsMenu(ctk.CTkToplevel):
@@ -24,7 +26,7 @@ class SettingsMenu(ctk.CTkToplevel):
 
     def _position_window(self):
         window_width = 400
-        window_height = 500
+        window_height = 680
         
         if self.button_widget:
             button_x = self.button_widget.winfo_rootx()
@@ -171,6 +173,60 @@ class SettingsMenu(ctk.CTkToplevel):
         )
         self.update_rate_label.pack(side="left")
 
+        renderer_frame = ctk.CTkFrame(monitor_frame, fg_color="transparent")
+        renderer_frame.pack(fill="x", pady=5)
+
+        renderer_label = ctk.CTkLabel(
+            renderer_frame,
+            text="Renderer:",
+            text_color=self.current_theme["TEXT_COLOR"]
+        )
+        renderer_label.pack(side="left", padx=(0, 10))
+
+        self.renderer_selector = ctk.CTkSegmentedButton(
+            renderer_frame,
+            values=list(MONITOR_RENDERERS),
+            command=self._on_renderer_change,
+            fg_color=self.current_theme["BUTTON_COLOR"],
+            selected_color=self.current_theme["ACCENT_COLOR"],
+            selected_hover_color=self.current_theme["ACCENT_COLOR"],
+            unselected_color=self.current_theme["BUTTON_COLOR"],
+            unselected_hover_color=self.current_theme["BUTTON_ACTIVE_COLOR"],
+            text_color=self.current_theme["TEXT_COLOR"]
+        )
+        self.renderer_selector.set(self.settings.get("monitor_renderer", DEFAULT_RENDERER))
+        self.renderer_selector.pack(side="left", padx=5)
+
+        # The graph widget is built at startup, so a new renderer needs a restart
+        renderer_note = ctk.CTkLabel(
+            renderer_frame,
+            text="(after restart)",
+            text_color=self.current_theme["TEXT_COLOR"]
+        )
+        renderer_note.pack(side="left", padx=5)
+
+        series_frame = ctk.CTkFrame(monitor_frame, fg_color="transparent")
+        series_frame.pack(fill="x", pady=5)
+        selected = self.settings.get("monitor_series", DEFAULT_SERIES)
+        self.series_checkboxes = {}
+        for position, (name, label) in enumerate(SERIES_LABELS.items()):
+            checkbox = ctk.CTkCheckBox(
+                series_frame,
+                text=label,
+                command=self._on_series_change,
+                fg_color=self.current_theme["ACCENT_COLOR"],
+                hover_color=self.current_theme["BUTTON_ACTIVE_COLOR"],
+                border_color=self.current_theme["BUTTON_COLOR"],
+                text_color=self.current_theme["TEXT_COLOR"],
+                font=(self.current_theme["BUTTON_STYLE"]["font"][0], 11),
+                checkbox_width=16,
+                checkbox_height=16
+            )
+            if name in selected:
+                checkbox.select()
+            checkbox.grid(row=position // 3, column=position % 3, sticky="w", padx=2, pady=2)
+            self.series_checkboxes[name] = checkbox
+
     def _create_theme_section(self):
         theme_frame = ctk.CTkFrame(
             self.content_frame,
@@ -226,16 +282,21 @@ class SettingsMenu(ctk.CTkToplevel):
         if event.widget not in (self, self.theme_dropdown, self.theme_dropdown._dropdown_menu):
             self.destroy()
 
+    def _save_setting(self, key, value):
+        # Reload first: the app saves settings too (e.g. the monitor's zoom
+        # window), and writing back our copy from opening time would undo them
+        self.settings = load_settings()
+        self.settings[key] = value
+        save_settings(self.settings)
+
     def _on_volume_change(self, value):
         volume = int(value)
-        self.settings['global_volume'] = volume
         self.volume_label.configure(text=f"Volume: {volume}%")
-        save_settings(self.settings)
+        self._save_setting('global_volume', volume)
 
     def _toggle_monitor(self):
         show_monitor = bool(self.monitor_switch.get())
-        self.settings['show_monitor'] = show_monitor
-        save_settings(self.settings)
+        self._save_setting('show_monitor', show_monitor)
         
         if self.app:
             if show_monitor:
@@ -247,16 +308,23 @@ class SettingsMenu(ctk.CTkToplevel):
 
     def _on_update_rate_change(self, value):
         rate = int(value)
-        self.settings['monitor_update_rate'] = rate
         self.update_rate_label.configure(text=f"{rate}s")
-        save_settings(self.settings)
+        self._save_setting('monitor_update_rate', rate)
         if self.app and hasattr(self.app, 'system_monitor'):
             self.app.system_monitor.set_update_rate(rate * 1000)
 
+    def _on_renderer_change(self, renderer):
+        self._save_setting('monitor_renderer', renderer)
+
+    def _on_series_change(self):
+        series = [name for name, checkbox in self.series_checkboxes.items() if checkbox.get()]
+        self._save_setting('monitor_series', series)
+        if self.app and hasattr(self.app, 'system_monitor'):
+            self.app.system_monitor.set_series(series)
+
     def _on_theme_select(self, theme_name):
         if self.on_theme_change:
-            self.settings['current_theme'] = theme_name
-            save_settings(self.settings)
+            self._save_setting('current_theme', theme_name)
             self.destroy()
             self.on_theme_change(theme_name)
             self.after(100, lambda: self.master.event_generate('<<ReopenSettings>>'))
\ No newline at end of file
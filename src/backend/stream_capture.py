@@ -0,0 +1,199 @@
+"""Record raw Ollama NDJSON streams with timing and replay them later.
+
+A capture is a gzip'd JSONL file: a header object followed by one
+[offset_ms, raw_line] pair per streamed line. Recording is enabled with
+"record_streams_dir" in settings.json; replay goes through ReplayClient,
+which stands in for OllamaClient:
+
+    handler = ChatbotHandler(event_manager, client=ReplayClient("turn.ndjson.gz", mode="accelerated", speed=4))
+    python -m backend.stream_capture turn.ndjson.gz
+
+Captures only hold generate streams, so ReplayClient has no embed();
+replay with the default bm25 retrieval backend.
+"""
+import gzip
+import itertools
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+CAPTURE_VERSION = 1
+CAPTURE_SUFFIX = ".ndjson.gz"
+REPLAY_MODES = ("original", "accelerated", "worst_case")
+
+class RecordingResponse:
+    """Wraps a streaming response and copies every line it yields to a capture"""
+
+    def __init__(self, response, path, payload):
+        self._response = response
+        self._path = Path(path)
+        self._file = None
+        self._closed = False
+        # close() comes from the GUI thread while the stream thread writes
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._header = {
+            "version": CAPTURE_VERSION,
+            "model": payload.get("model"),
+            "options": payload.get("options", {}),
+            "prompt_chars": len(payload.get("prompt", "")),
+            "recorded_at": datetime.now().isoformat(timespec="seconds")
+        }
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def iter_lines(self, *args, **kwargs):
+        try:
+            for line in self._response.iter_lines(*args, **kwargs):
+                if line:
+                    self._write(line)
+                yield line
+        finally:
+            self._finish()
+
+    def close(self):
+        self._response.close()
+        self._finish()
+
+    def _write(self, line):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        offset_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        with self._lock:
+            if self._closed:
+                # Reopening with "wt" would truncate the capture
+                return
+            if self._file is None:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = gzip.open(self._path, "wt", encoding="utf-8")
+                self._file.write(json.dumps(self._header) + "\n")
+            self._file.write(json.dumps([offset_ms, line], ensure_ascii=False) + "\n")
+
+    def _finish(self):
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class StreamRecorder:
+    """Creates one capture file per streamed request in a directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._counter = itertools.count(1)
+
+    def wrap(self, response, payload):
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{next(self._counter):04d}{CAPTURE_SUFFIX}"
+        return RecordingResponse(response, self.directory / name, payload)
+
+def load_capture(path):
+    """Return (header, [(offset_seconds, raw_line), ...]) for a capture file"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        lines = []
+        for row in f:
+            if row.strip():
+                offset_ms, line = json.loads(row)
+                lines.append((offset_ms / 1000, line))
+    return header, lines
+
+class ReplayResponse:
+    """Streams a capture's lines with its recorded timing, like a requests response"""
+
+    def __init__(self, lines, mode="original", speed=1.0):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode '{mode}'")
+        if speed <= 0:
+            raise ValueError(f"Replay speed must be positive, got {speed}")
+        self.lines = lines
+        self.mode = mode
+        self.speed = speed if mode == "accelerated" else 1.0
+        self.status_code = 200
+        self._closed = threading.Event()
+
+    def iter_lines(self, decode_unicode=False, **kwargs):
+        started = time.perf_counter()
+        for offset, line in self.lines:
+            if self.mode != "worst_case":
+                # worst_case drops every gap so the whole stream arrives in one burst
+                delay = offset / self.speed - (time.perf_counter() - started)
+                if delay > 0 and self._closed.wait(delay):
+                    return
+            if self._closed.is_set():
+                return
+            yield line if decode_unicode else line.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.lines[-1][1]) if self.lines else {}
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self._closed.set()
+
+class ReplayClient:
+    """Drop-in OllamaClient replacement that answers every generate with captures.
+
+    Several captures are served in turn, cycling once the list is exhausted.
+    """
+
+    def __init__(self, captures, mode="original", speed=1.0):
+        if isinstance(captures, (str, Path)):
+            captures = [captures]
+        if speed <= 0:
+            raise ValueError(f"Replay speed must be positive, got {speed}")
+        self.captures = [load_capture(path) for path in captures]
+        self.mode = mode
+        self.speed = speed
+        self._cycle = itertools.cycle(self.captures)
+        self._lock = threading.Lock()
+
+    def generate(self, payload, stream=True):
+        with self._lock:
+            _, lines = next(self._cycle)
+        return ReplayResponse(lines, self.mode, self.speed)
+
+    chat = generate
+
+    def iter_stream(self, response):
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
+
+    def warm(self, model, keep_alive=None, options=None):
+        return {"model": model, "done": True}
+
+    def unload(self, model, timeout=None):
+        return {"model": model, "done": True}
+
+    def list_models(self):
+        return []
+
+    def running_models(self):
+        return []
+
+    def close(self):
+        pass
+
+def describe_capture(path):
+    """Summarize a capture's timing: time to first token and decode rate"""
+    header, lines = load_capture(path)
+    tokens = [(offset, json.loads(line)) for offset, line in lines]
+    token_offsets = [offset for offset, data in tokens if data.get("response")]
+    summary = {"model": header.get("model"), "recorded_at": header.get("recorded_at"), "lines": len(lines)}
+    if token_offsets:
+        decode_time = token_offsets[-1] - token_offsets[0]
+        summary["first_token_ms"] = round(token_offsets[0] * 1000, 1)
+        summary["duration_ms"] = round(lines[-1][0] * 1000, 1)
+        summary["tokens_per_second"] = round((len(token_offsets) - 1) / decode_time, 2) if decode_time else None
+    return summary
+
+if __name__ == "__main__":
+    for capture_path in sys.argv[1:]:
+        print(json.dumps({"capture": capture_path, **describe_capture(capture_path)}))
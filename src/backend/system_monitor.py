@@ -1,13 +1,65 @@
-from collections import deque
-import psutil
-from .settings_manager import load_settings
+import math
+import time
+import numpy as np
+from .metric_history import HISTORY_DIR, lttb
+from .metric_sampler import MetricSampler, SAMPLE_INTERVAL_SECONDS, SERIES_UNITS
+from .monitor_renderers import CanvasRenderer, MatplotlibRenderer, DEFAULT_RENDERER
+from .settings_manager import load_settings, save_settings
+
+DISPLAY_POINTS = 120
+# Zoom windows in seconds, with the spacing of their x ticks
+MONITOR_WINDOWS = {"5m": (300, 60), "1h": (3600, 900), "24h": (86400, 21600)}
+DEFAULT_WINDOW = "5m"
+# Selectable series; "cores" draws one line per core
+SERIES_LABELS = {
+    "cpu": "CPU",
+    "cores": "Cores",
+    "load": "Load",
+    "memory": "Memory",
+    "swap": "Swap",
+    "disk_read": "Disk read",
+    "disk_write": "Disk write",
+    "net_recv": "Net in",
+    "net_sent": "Net out",
+    "ollama_cpu": "Ollama CPU",
+    "ollama_memory": "Ollama memory",
+    "ollama_thread": "Ollama thread"
+}
+DEFAULT_SERIES = ["cpu", "memory"]
+# Themes only define the CPU and memory colors; the rest can be overridden by key
+SERIES_COLORS = {
+    "load": "#E6A23C",
+    "swap": "#D9534F",
+    "disk_read": "#5BC0DE",
+    "disk_write": "#337AB7",
+    "net_recv": "#8BC34A",
+    "net_sent": "#4CAF50",
+    "ollama_cpu": "#FF79C6",
+    "ollama_memory": "#BD93F9",
+    "ollama_thread": "#FFB86C"
+}
+CORE_LINE_ALPHA = 0.4
+RENDERERS = {"canvas": CanvasRenderer, "matplotlib": MatplotlibRenderer}
 
 class SystemMonitor:
+    """System metric sparklines, drawn by a native Tk canvas or matplotlib renderer.
+
+    A MetricSampler thread records samples at monitor_sample_rate into an
+    on-disk history while this class renders at monitor_update_rate. Each
+    tick reads the zoom window (5 min, 1 h or 24 h; click or scroll the
+    graph to change it) from the coarsest resolution that covers it and
+    downsamples it to DISPLAY_POINTS with LTTB, so a tick costs the same
+    whatever the window. Rendering is skipped while the window is
+    minimized, and the sampler keeps recording meanwhile.
+
+    The renderer (see monitor_renderers) builds one line per series once;
+    set_series() picks which are visible. Each tick only moves the visible
+    lines; the axes are rebuilt when the theme or the selection changes,
+    or a series measured in MB/s outgrows the y axis.
+    """
+
     def __init__(self, gui_components):
         # Initialize core components
-        self.canvas = gui_components["canvas"]
-        self.fig = gui_components["figure"]
-        self.ax = gui_components["ax"]
         self.colors = gui_components["colors"]
         
         # Load settings and initialize state
@@ -16,30 +68,120 @@ class SystemMonitor:
         self.is_running = False
         self.after_id = None
         self.root = None
+        self.sampler = MetricSampler(
+            settings.get("monitor_sample_rate", SAMPLE_INTERVAL_SECONDS),
+            settings.get("monitor_history_dir", HISTORY_DIR)
+        )
+        self.selected = [name for name in settings.get("monitor_series", DEFAULT_SERIES) if name in SERIES_LABELS]
+        self.window = settings.get("monitor_window", DEFAULT_WINDOW)
+        if self.window not in MONITOR_WINDOWS:
+            self.window = DEFAULT_WINDOW
 
-        # Initialize data storage
-        self.cpu_usage_trend = deque([0] * 50, maxlen=50)
-        self.memory_usage_trend = deque([0] * 50, maxlen=50)
-        
-        self._initialize_plot()
+        # Downsampled points of the visible series, seconds before now on x
+        self.trend_x = self.trend_y = np.empty((0, 0))
+        self.y_top = 100
+
+        self._apply_selection()
+        renderer = RENDERERS.get(gui_components.get("renderer"), RENDERERS[DEFAULT_RENDERER])
+        self.renderer = renderer(self, gui_components)
+        self.renderer.rebuild()
+
+    def _rows(self, name):
+        if name == "cores":
+            return [i for i, series in enumerate(self.sampler.series) if series.startswith("core")]
+        return [self.sampler.index[name]]
+
+    def line_counts(self):
+        """Number of lines each selectable series draws"""
+        return {name: len(self._rows(name)) for name in SERIES_LABELS}
+
+    def label(self, name):
+        return SERIES_LABELS[name]
+
+    def color(self, name):
+        if name in ("cpu", "cores"):
+            return self.colors["cpu"]
+        if name == "memory":
+            return self.colors["memory"]
+        return self.colors.get(name, SERIES_COLORS[name])
+
+    def alpha(self, name):
+        return CORE_LINE_ALPHA if name == "cores" else None
+
+    def title(self):
+        return f"System Monitor ({self.window})"
+
+    def window_seconds(self):
+        return MONITOR_WINDOWS[self.window][0]
+
+    def x_ticks(self):
+        """Return the x tick positions of the zoom window and their labels"""
+        seconds, tick_spacing = MONITOR_WINDOWS[self.window]
+        ticks = np.arange(-seconds, 1, tick_spacing)
+        return ticks, [_format_age(-tick) for tick in ticks]
+
+    def _apply_selection(self):
+        self.visible_rows = [row for name in self.selected for row in self._rows(name)]
+        units = sorted({SERIES_UNITS.get(name, "%") for name in self.selected})
+        self.percent_only = units in ([], ["%"])
+        self.y_label = "Usage (%)" if self.percent_only else " / ".join(units)
+
+    def set_series(self, names):
+        """Show the given series (keys of SERIES_LABELS) from now on"""
+        self.selected = [name for name in names if name in SERIES_LABELS]
+        self._apply_selection()
+        self._refresh_trends()
+        self._update_y_axis()
+        self.renderer.rebuild()
+
+    def set_window(self, window):
+        """Zoom to one of MONITOR_WINDOWS"""
+        if window not in MONITOR_WINDOWS:
+            return
+        self.window = window
+        settings = load_settings()
+        settings["monitor_window"] = window
+        save_settings(settings)
+        self._refresh_trends()
+        self._update_y_axis()
+        self.renderer.rebuild()
+
+    def cycle_window(self):
+        windows = list(MONITOR_WINDOWS)
+        self.set_window(windows[(windows.index(self.window) + 1) % len(windows)])
 
-    def _initialize_plot(self):
-        """Initialize plot appearance and styling"""
-        self.ax.set_facecolor(self.colors["background"])
-        self.fig.patch.set_facecolor(self.colors["background"])
-        self._update_plot_style()
-        self.canvas.draw()
+    def zoom(self, step):
+        """Move step windows longer (positive) or shorter (negative)"""
+        windows = list(MONITOR_WINDOWS)
+        position = windows.index(self.window) + step
+        self.set_window(windows[max(0, min(position, len(windows) - 1))])
+
+    def _trend(self, name):
+        row = self.sampler.index[name]
+        if row not in self.visible_rows:
+            return np.empty(0)
+        return self.trend_y[self.visible_rows.index(row)]
+
+    @property
+    def cpu_usage_trend(self):
+        return self._trend("cpu")
+
+    @property
+    def memory_usage_trend(self):
+        return self._trend("memory")
 
     def start(self):
         """Start monitoring system resources"""
         if not self.is_running:
             self.is_running = True
-            self.root = self.canvas.get_tk_widget().winfo_toplevel()
+            self.sampler.start()
+            self.root = self.renderer.widget.winfo_toplevel()
             self.update()
 
     def stop(self):
         """Stop monitoring system resources"""
         self.is_running = False
+        self.sampler.stop()
         if self.after_id is not None:
             try:
                 if self.root:
@@ -49,132 +191,74 @@ class SystemMonitor:
             self.after_id = None
 
     def set_update_rate(self, rate_ms):
-        """Set the update rate for monitoring"""
+        """Set how often the graph is redrawn; sampling keeps its own rate"""
         self.update_rate = rate_ms
-        if self.is_running:
-            self.stop()
-            self.start()
+        if self.is_running and self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.update()
 
     def update(self):
-        """Update system metrics and plot"""
+        """Redraw the plot from the sampler's newest samples"""
         if not self.is_running:
             return
 
         try:
-            # Get current system metrics
-            self.cpu_usage_trend.append(psutil.cpu_percent())
-            self.memory_usage_trend.append(psutil.virtual_memory().percent)
-            
-            # Clear and redraw plot
-            self.ax.clear()
-            cpu_line = self.ax.plot(
-                list(range(len(self.cpu_usage_trend))),
-                list(self.cpu_usage_trend),
-                color=self.colors["cpu"],
-                linewidth=1.0
-            )[0]
-            
-            mem_line = self.ax.plot(
-                list(range(len(self.memory_usage_trend))),
-                list(self.memory_usage_trend),
-                color=self.colors["memory"],
-                linewidth=1.0
-            )[0]
-            
-            # Configure legend
-            self.ax.legend(
-                [cpu_line, mem_line],
-                ["CPU", "Memory"],
-                loc="upper right",
-                fontsize=6,
-                frameon=False,
-                labelcolor=self.colors["text"],
-                handlelength=1.0,
-                handletextpad=0.4,
-                borderpad=0.2,
-                borderaxespad=0.2
-            )
-            
-            self._update_plot_style()
-            self.canvas.draw()
-            
+            # Nothing to see while minimized; the sampler keeps the data
+            if self.renderer.widget.winfo_viewable():
+                self._refresh_trends()
+                if self._update_y_axis():
+                    self.renderer.rebuild()
+                else:
+                    self.renderer.draw_lines()
+
             if self.root:
                 self.after_id = self.root.after(self.update_rate, self.update)
         except Exception as e:
             print(f"Error updating system monitor: {e}")
             self.stop()
 
-    def _update_plot_style(self):
-        """Configure plot styling and appearance"""
-        # Configure spine appearance
-        for spine in self.ax.spines.values():
-            spine.set_color(self.colors["text"])
-            spine.set_linewidth(0.8)
-
-        self.ax.spines['top'].set_visible(False)
-        self.ax.spines['right'].set_visible(False)
-
-        # Configure axis appearance
-        self.ax.tick_params(
-            axis='both',
-            colors=self.colors["text"],
-            labelsize=6,
-            width=0.8,
-            length=3,
-            direction='out'
-        )
-
-        # Set axis limits and labels
-        self.ax.set_ylim(0, 100)
-        self.ax.set_xlim(0, self.cpu_usage_trend.maxlen - 1)
-        
-        self.ax.set_ylabel(
-            "Usage (%)", 
-            color=self.colors["text"], 
-            fontsize=6,
-            labelpad=2
-        )
-        
-        self.ax.set_xlabel(
-            "Time",
-            color=self.colors["text"],
-            fontsize=6,
-            labelpad=2
-        )
-        
-        # Configure title
-        self.ax.set_title(
-            "System Monitor",
-            fontsize=8,
-            fontweight="bold",
-            color=self.colors["text"],
-            pad=2
-        )
+    def _refresh_trends(self):
+        """Downsample the visible series over the zoom window to DISPLAY_POINTS"""
+        seconds = MONITOR_WINDOWS[self.window][0]
+        now = time.time()
+        times, values = self.sampler.snapshot(seconds)
+        x_values, y_values = lttb(times, values[self.visible_rows], DISPLAY_POINTS)
+        self.trend_x = x_values - now
+        self.trend_y = y_values.astype(np.float64)
+        # Break the lines where the app was not running instead of bridging the gap
+        gap = max(3 * seconds / DISPLAY_POINTS, 5 * self.sampler.interval)
+        self.trend_y[:, 1:][np.diff(self.trend_x, axis=1) > gap] = np.nan
 
-        # Adjust subplot layout
-        self.fig.subplots_adjust(
-            left=0.15,
-            right=0.95,
-            bottom=0.25,
-            top=0.85
-        )
-        
-        # Set background colors
-        self.ax.set_facecolor(self.colors["background"])
-        self.fig.patch.set_facecolor(self.colors["background"])
-        
-        # Add grid
-        self.ax.grid(
-            True,
-            linestyle=':',
-            alpha=0.1,
-            color=self.colors["text"]
-        )
+    def _update_y_axis(self):
+        """Fit the y axis to the visible series, returning True if it changed"""
+        top = 100
+        if not self.percent_only and self.visible_rows:
+            peak = np.nanmax(self.trend_y, initial=0.0)
+            top = _nice_ceiling(peak * 1.1)
+        current = self.y_top
+        # Grow at once but only shrink once well below, so the axis does not flap
+        if top == current or (not self.percent_only and current / 4 < top < current):
+            return False
+        self.y_top = top
+        return True
 
     def update_colors(self, new_colors):
         """Update color scheme of the plot"""
         self.colors = new_colors
-        self._initialize_plot()
-        if self.is_running:
-            self._update_plot_style()
-            self.canvas.draw()
\ No newline at end of file
+        self.renderer.rebuild()
+
+def _format_age(seconds):
+    if seconds == 0:
+        return "now"
+    if seconds >= 3600:
+        return f"{seconds / 3600:g}h"
+    if seconds >= 60:
+        return f"{seconds / 60:g}m"
+    return f"{seconds:g}s"
+
+def _nice_ceiling(value):
+    """Round value up to 1, 2 or 5 times a power of ten"""
+    if value <= 1:
+        return 1
+    magnitude = 10 ** math.floor(math.log10(value))
+    return next(step * magnitude for step in (1, 2, 5, 10) if step * magnitude >= value)
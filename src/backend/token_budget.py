@@ -0,0 +1,85 @@
+import re
+from collections import deque
+from itertools import islice
+
+# Words split into pieces of up to four characters plus each punctuation
+# mark tracks BPE tokenizers closely enough for budgeting English text.
+TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+MESSAGE_OVERHEAD_TOKENS = 4
+DEFAULT_RESPONSE_RESERVE = 1024
+
+def estimate_tokens(text):
+    """Approximate the number of model tokens in text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+class ConversationBudget:
+    """Conversation history that trims its oldest turns to fit num_ctx.
+
+    Each message's token count is computed once when it is appended and
+    cached next to it, so trimming is an incremental running-total update.
+    Counts can later be replaced by the exact figures Ollama reports.
+    """
+
+    def __init__(self, num_ctx, reserve_tokens=DEFAULT_RESPONSE_RESERVE, counter=estimate_tokens):
+        self.num_ctx = num_ctx
+        self.reserve_tokens = reserve_tokens
+        self.counter = counter
+        self.prompt_tokens = 0
+        self.total_tokens = 0
+        self._messages = deque()
+        self._counts = deque()
+
+    @property
+    def budget(self):
+        """Tokens available to history after the prompt and the reply reserve"""
+        return max(0, self.num_ctx - self.reserve_tokens - self.prompt_tokens)
+
+    def count(self, content):
+        return self.counter(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def set_prompt_tokens(self, tokens):
+        """Set the fixed prompt cost (system prompt etc.), returning trimmed turns"""
+        self.prompt_tokens = tokens
+        return self.trim()
+
+    def append(self, message, tokens=None):
+        """Append a (role, content) turn, returning the turns trimmed to fit"""
+        count = self.count(message[1]) if tokens is None else tokens
+        self._messages.append(message)
+        self._counts.append(count)
+        self.total_tokens += count
+        return self.trim()
+
+    def update_last_count(self, tokens):
+        """Replace the cached count of the newest turn with an exact figure"""
+        if self._counts and tokens:
+            self.total_tokens += tokens - self._counts[-1]
+            self._counts[-1] = tokens
+
+    def trim(self):
+        trimmed = []
+        # The newest turn is always kept, even if it alone exceeds the budget
+        while self.total_tokens > self.budget and len(self._messages) > 1:
+            trimmed.append(self._messages.popleft())
+            self.total_tokens -= self._counts.popleft()
+        return trimmed
+
+    def window(self, extra_tokens=0):
+        """Return the newest turns that fit with extra_tokens set aside, without trimming"""
+        total = self.total_tokens
+        start = 0
+        while total + extra_tokens > self.budget and start < len(self._messages) - 1:
+            total -= self._counts[start]
+            start += 1
+        return list(islice(self._messages, start, None))
+
+    def clear(self):
+        self._messages.clear()
+        self._counts.clear()
+        self.total_tokens = 0
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __len__(self):
+        return len(self._messages)
@@ -0,0 +1,292 @@
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import numpy as np
+from .read_write_manager import ReadWriteManager
+from .retrieval_index import CHUNK_TOKENS, CONTEXT_TOKENS, TOP_K, format_context, iter_file_chunks
+
+VECTOR_STORE_DIR = "vector_store"
+EMBEDDING_MODEL = "nomic-embed-text"
+EMBED_BATCH = 32
+EMBED_CONCURRENCY = 2
+INITIAL_ROWS = 1024
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class VectorStore:
+    """Embedding index over ReadWriteManager's folder, searched by cosine similarity.
+
+    Vectors are unit-normalized float32 rows of a memory-mapped matrix, so
+    opening the store maps the file instead of reading it and a query is one
+    matrix-vector product. A SQLite sidecar maps each row offset to its chunk
+    and content hash. Chunks whose hash is already stored are never sent to
+    Ollama again; freed rows are zeroed and reused by later additions.
+    """
+
+    def __init__(self, client, manager=None, directory=VECTOR_STORE_DIR, model=EMBEDDING_MODEL,
+                 batch_size=EMBED_BATCH, concurrency=EMBED_CONCURRENCY, chunk_tokens=CHUNK_TOKENS):
+        self.client = client
+        self.manager = manager or ReadWriteManager()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.chunk_tokens = chunk_tokens
+        self.vectors_path = self.directory / "vectors.f32"
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._db = sqlite3.connect(self.directory / "rows.sqlite3", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);"
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);"
+            "CREATE TABLE IF NOT EXISTS rows (offset INTEGER PRIMARY KEY, hash TEXT, path TEXT, "
+            "position INTEGER, text TEXT);"
+            "CREATE INDEX IF NOT EXISTS rows_path ON rows(path);"
+            "CREATE INDEX IF NOT EXISTS rows_hash ON rows(hash);"
+        )
+        self._db.commit()
+        self.dim = self._meta("dim")
+        self.row_count = self._meta("row_count") or 0
+        self._matrix = None
+        if self._meta("model") not in (None, model):
+            # Vectors from another model live in a different space
+            self.clear()
+        elif self.dim and self.vectors_path.exists():
+            self._map()
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _map(self, rows=None):
+        """(Re)map the vector file, growing it to hold at least rows rows"""
+        row_bytes = self.dim * 4
+        capacity = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        if rows is not None and rows > capacity:
+            capacity = max(rows, capacity * 2, INITIAL_ROWS)
+            if self._matrix is not None:
+                self._matrix.flush()
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        if capacity == 0:
+            # np.memmap cannot map an empty file; the first added row grows it
+            self._matrix = None
+            return
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+            self._db.executescript("DELETE FROM rows; DELETE FROM files; DELETE FROM meta;")
+            self._set_meta("model", self.model)
+            self._db.commit()
+            if self.vectors_path.exists():
+                self.vectors_path.unlink()
+            self.dim = None
+            self.row_count = 0
+
+    def refresh(self):
+        """Embed chunks of new or changed files and drop those of removed ones"""
+        changes = {"embedded": 0, "reused": 0, "removed": 0}
+        with self._refresh_lock:
+            known = dict(((path, (mtime_ns, size)) for path, mtime_ns, size in
+                          self._db.execute("SELECT path, mtime_ns, size FROM files").fetchall()))
+            for name in self.manager.list_files():
+                try:
+                    stat = (self.manager.base_folder / name).stat()
+                except OSError:
+                    continue
+                if known.pop(name, None) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                self._update_file(name, stat, changes)
+            for name in known:
+                self._forget_file(name, changes)
+        return changes
+
+    def _forget_file(self, name, changes):
+        changes["removed"] += self._remove_rows(self._offsets_for(name))
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE path = ?", (name,))
+            self._db.commit()
+
+    def apply_changes(self, changes):
+        """Update just the files named in an AI_FILES_CHANGED event"""
+        result = {"embedded": 0, "reused": 0, "removed": 0}
+        with self._refresh_lock:
+            try:
+                for name in changes.get("removed", []):
+                    if not (self.manager.base_folder / name).exists():
+                        self._forget_file(name, result)
+                for name in changes.get("added", []) + changes.get("modified", []):
+                    try:
+                        stat = (self.manager.base_folder / name).stat()
+                    except OSError:
+                        continue
+                    known = self._db.execute("SELECT mtime_ns, size FROM files WHERE path = ?", (name,)).fetchone()
+                    if known != (stat.st_mtime_ns, stat.st_size):
+                        self._update_file(name, stat, result)
+            except Exception as e:
+                print(f"Error updating vector store: {e}")
+        return result
+
+    def refresh_async(self):
+        thread = threading.Thread(target=self._refresh_logged, daemon=True)
+        thread.start()
+        return thread
+
+    def _refresh_logged(self):
+        try:
+            changes = self.refresh()
+            if changes["embedded"] or changes["removed"]:
+                print(f"Vector store: {changes['embedded']} chunks embedded, {changes['reused']} reused, "
+                      f"{changes['removed']} removed")
+        except Exception as e:
+            print(f"Error refreshing vector store: {e}")
+
+    def _offsets_for(self, name):
+        return [row[0] for row in self._db.execute("SELECT offset FROM rows WHERE path = ?", (name,)).fetchall()]
+
+    def _update_file(self, name, stat, changes):
+        # Rows whose text is unchanged keep their vectors; only their position moves
+        old = {}
+        for offset, chunk_hash in self._db.execute(
+            "SELECT offset, hash FROM rows WHERE path = ?", (name,)
+        ).fetchall():
+            old.setdefault(chunk_hash, []).append(offset)
+
+        pending = []
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for position, text in enumerate(iter_file_chunks(self.manager, name, self.chunk_tokens)):
+                chunk_hash = content_hash(text)
+                if old.get(chunk_hash):
+                    offset = old[chunk_hash].pop()
+                    with self._lock:
+                        self._db.execute("UPDATE rows SET position = ? WHERE offset = ?", (position, offset))
+                    changes["reused"] += 1
+                    continue
+                if self._copy_existing(chunk_hash, name, position, text):
+                    changes["reused"] += 1
+                    continue
+                pending.append((position, text, chunk_hash))
+                if len(pending) == self.batch_size:
+                    # Bound the work queued ahead of the embedding requests
+                    if len(in_flight) >= self.concurrency * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        self._store_batches(done, name, changes)
+                    in_flight.add(executor.submit(self._embed_batch, pending))
+                    pending = []
+            if pending:
+                in_flight.add(executor.submit(self._embed_batch, pending))
+            done, _ = wait(in_flight)
+            self._store_batches(done, name, changes)
+
+        changes["removed"] += self._remove_rows([offset for offsets in old.values() for offset in offsets])
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                (name, stat.st_mtime_ns, stat.st_size)
+            )
+            self._db.commit()
+
+    def _embed_batch(self, batch):
+        vectors = self.client.embed(self.model, [text for _, text, _ in batch])
+        return batch, np.asarray(vectors, dtype=np.float32)
+
+    def _store_batches(self, futures, name, changes):
+        for future in futures:
+            batch, vectors = future.result()
+            for (position, text, chunk_hash), vector in zip(batch, vectors):
+                self._add_row(vector, chunk_hash, name, position, text)
+            changes["embedded"] += len(batch)
+
+    def _copy_existing(self, chunk_hash, name, position, text):
+        """Reuse the vector of an identical chunk stored for another file"""
+        row = self._db.execute("SELECT offset FROM rows WHERE hash = ? LIMIT 1", (chunk_hash,)).fetchone()
+        if row is None:
+            return False
+        self._add_row(np.array(self._matrix[row[0]]), chunk_hash, name, position, text, normalized=True)
+        return True
+
+    def _add_row(self, vector, chunk_hash, name, position, text, normalized=False):
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(vector)
+                self._set_meta("dim", self.dim)
+                self._set_meta("model", self.model)
+            free = self._db.execute("SELECT offset FROM rows WHERE hash IS NULL LIMIT 1").fetchone()
+            if free is not None:
+                offset = free[0]
+            else:
+                offset = self.row_count
+                self.row_count += 1
+                self._set_meta("row_count", self.row_count)
+            if self._matrix is None or offset >= len(self._matrix):
+                self._map(rows=offset + 1)
+            if not normalized:
+                norm = np.linalg.norm(vector)
+                vector = vector / norm if norm else vector
+            self._matrix[offset] = vector
+            self._db.execute(
+                "INSERT OR REPLACE INTO rows (offset, hash, path, position, text) VALUES (?, ?, ?, ?, ?)",
+                (offset, chunk_hash, name, position, text)
+            )
+
+    def _remove_rows(self, offsets):
+        if not offsets:
+            return 0
+        with self._lock:
+            for offset in offsets:
+                # A zero row never scores above an unrelated chunk; the row is
+                # marked free with a NULL hash and handed out again later
+                self._matrix[offset] = 0
+            self._db.executemany(
+                "UPDATE rows SET hash = NULL, path = NULL, position = NULL, text = NULL WHERE offset = ?",
+                [(offset,) for offset in offsets]
+            )
+            self._db.commit()
+        return len(offsets)
+
+    def search(self, query, top_k=TOP_K):
+        """Return the top_k chunks most similar to query as dicts with path, position, text and score"""
+        if self._matrix is None or not self.row_count:
+            return []
+        query_vector = np.asarray(self.client.embed(self.model, query)[0], dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if not norm:
+            return []
+        with self._lock:
+            scores = self._matrix[:self.row_count] @ (query_vector / norm)
+            # Over-fetch a little in case freed rows land among the best
+            count = min(top_k * 2, len(scores))
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best])]
+            results = []
+            for offset in best:
+                row = self._db.execute(
+                    "SELECT path, position, text FROM rows WHERE offset = ? AND hash IS NOT NULL", (int(offset),)
+                ).fetchone()
+                if row is not None and len(results) < top_k:
+                    results.append({"path": row[0], "position": row[1], "text": row[2].strip(),
+                                    "score": float(scores[offset])})
+        return results
+
+    def build_context(self, query, token_budget=CONTEXT_TOKENS, top_k=TOP_K):
+        """Format the most similar chunks as prompt context that fits token_budget"""
+        return format_context(self.search(query, top_k), token_budget)
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._db.close()
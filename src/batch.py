@@ -0,0 +1,178 @@
+"""Run a JSONL file of prompts through Pip-Pi without the GUI.
+
+Each input line is an object with a "prompt" and optionally an "id", a
+"personality" and a "history" list of [role, content] pairs:
+
+    python batch.py prompts.jsonl -o responses.jsonl --concurrency 2
+
+Responses are written as JSONL in completion order while the batch runs,
+followed by a throughput summary on stderr.
+"""
+import argparse
+import json
+import math
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from backend import ChatbotHandler, EventManager, OllamaClient, load_settings
+
+DEFAULT_CONCURRENCY = 1
+
+def read_prompts(path, personalities=None):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number}: {e}", file=sys.stderr)
+                continue
+            if isinstance(record, str):
+                record = {"prompt": record}
+            if not isinstance(record, dict) or not isinstance(record.get("prompt"), str):
+                print(f"Skipping line {line_number}: expected a string or an object with a \"prompt\"",
+                      file=sys.stderr)
+                continue
+            personality = record.get("personality")
+            if personalities is not None and personality and (
+                    not isinstance(personality, str) or personality not in personalities):
+                print(f"Skipping line {line_number}: unknown personality {personality!r}", file=sys.stderr)
+                continue
+            record.setdefault("id", line_number)
+            yield record
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+class BatchRunner:
+    def __init__(self, handler, output, concurrency=DEFAULT_CONCURRENCY, personality=None):
+        self.handler = handler
+        self.output = output
+        self.concurrency = max(1, concurrency)
+        self.personality = personality
+        self.results = []
+        self.errors = 0
+        self._write_lock = threading.Lock()
+
+    def run(self, records):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = set()
+            for record in records:
+                # Keep only a small window of prompts queued so huge files stream through
+                if len(in_flight) >= self.concurrency * 2:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(self._run_one, record))
+            wait(in_flight)
+        return self.summary(time.perf_counter() - started)
+
+    def _run_one(self, record):
+        personality = record.get("personality") or self.personality
+        result = {"id": record["id"], "personality": personality or self.handler.current_personality}
+        try:
+            result.update(self.handler.complete(
+                record["prompt"],
+                personality=personality,
+                history=record.get("history", ())
+            ))
+        except Exception as e:
+            result["error"] = str(e)
+        self._write(result)
+
+    def _write(self, result):
+        with self._write_lock:
+            if "error" in result:
+                self.errors += 1
+            else:
+                self.results.append(result)
+            self.output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self.output.flush()
+
+    def summary(self, elapsed):
+        ttfts = sorted(r["ttft_seconds"] for r in self.results if r.get("ttft_seconds") is not None)
+        tokens = sum(r.get("eval_count", 0) for r in self.results)
+        completed = len(self.results)
+        p50 = percentile(ttfts, 0.50)
+        p95 = percentile(ttfts, 0.95)
+        return {
+            "requests": completed + self.errors,
+            "completed": completed,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(completed / elapsed, 3) if elapsed else 0.0,
+            "tokens_per_second": round(tokens / elapsed, 2) if elapsed else 0.0,
+            "ttft_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "ttft_p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run prompts through Pip-Pi without the GUI")
+    parser.add_argument("prompts", help="JSONL file of prompts")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for responses (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="requests in flight at once; match OLLAMA_NUM_PARALLEL")
+    parser.add_argument("-p", "--personality", help="personality for prompts that do not name one")
+    parser.add_argument("--personalities", help="alternative ai_config.json")
+    parser.add_argument("--api-base", help="Ollama API base URL, e.g. http://localhost:11434/api")
+    args = parser.parse_args()
+
+    # Keep the handler away from ai_files, the response cache and stream recordings
+    workdir = tempfile.TemporaryDirectory(prefix="pip-pi-batch-")
+    settings = {
+        "response_cache": False,
+        "summary_cache": False,
+        "retrieval_enabled": False,
+        "ai_files_dir": str(Path(workdir.name) / "ai_files")
+    }
+    personality = load_settings().get("personality")
+    if personality:
+        settings["personality"] = personality
+    if args.personalities:
+        with open(args.personalities) as f:
+            personalities = json.load(f)
+        if args.personality and args.personality not in personalities:
+            parser.error(f"unknown personality '{args.personality}'")
+        if settings.get("personality") not in personalities:
+            # The handler starts on this personality, so it must exist in the file
+            settings["personality"] = args.personality or next(iter(personalities))
+
+    client = OllamaClient(api_base=args.api_base, pool_size=max(args.concurrency, 1), record_dir=False)
+    try:
+        # Models already in memory belong to someone else, e.g. the GUI
+        loaded_before = {model.get("name") for model in client.running_models()}
+    except Exception as e:
+        print(f"Error listing running models, none will be unloaded: {e}", file=sys.stderr)
+        loaded_before = None
+    handler = ChatbotHandler(event_manager=EventManager(), client=client, settings=settings,
+                             personalities_path=args.personalities)
+    if args.personality and args.personality not in handler.personalities:
+        parser.error(f"unknown personality '{args.personality}'")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        runner = BatchRunner(handler, output, args.concurrency, args.personality)
+        summary = runner.run(read_prompts(args.prompts, handler.personalities))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if loaded_before is None:
+            loaded_before = {config["model_name"] for config in handler.personalities.values()}
+        handler.shutdown(keep_models=loaded_before)
+        client.close()
+        workdir.cleanup()
+
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""End-to-end latency benchmark for the chat pipeline.
+
+Starts the stub Ollama server and drives ChatbotHandler -> EventManager ->
+ChatStreamBuffer -> chat window exactly as MainApp wires them, with either
+a fake text sink or a real CTkTextbox (run that one under Xvfb):
+
+    python benchmark.py --sink fake --rates 10 30 100 0
+    xvfb-run python benchmark.py --sink ctk --compare benchmark_results/before.json
+    python benchmark.py --capture captures/turn.ndjson.gz --capture-mode worst_case
+
+Each scenario reports time-to-first-token, time-to-first-paint, render cost
+per flush and per chunk, and total UI-thread busy time. Results are saved
+as JSON so runs can be compared.
+"""
+import argparse
+import heapq
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from backend import ChatStreamBuffer, ChatbotHandler, EventManager, GUIManager, OllamaClient
+from backend.ollama_stub import StubOllamaServer
+from backend.stream_capture import REPLAY_MODES, ReplayClient
+
+RESULTS_DIR = Path("benchmark_results")
+DEFAULT_RATES = [10, 30, 100, 0]
+DEFAULT_REPLY_TOKENS = 300
+DEFAULT_TRANSCRIPT_KB = 200
+SCENARIO_TIMEOUT = 120
+
+class FakeRoot:
+    """Single-threaded stand-in for Tk's after() scheduling"""
+
+    def __init__(self):
+        self._queue = []
+        self._cancelled = set()
+        self._next_id = 0
+
+    def after(self, ms, func, *args):
+        self._next_id += 1
+        heapq.heappush(self._queue, (time.perf_counter() + ms / 1000, self._next_id, func, args))
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self._cancelled.add(after_id)
+
+    def update(self):
+        now = time.perf_counter()
+        while self._queue and self._queue[0][0] <= now:
+            _, after_id, func, args = heapq.heappop(self._queue)
+            if after_id in self._cancelled:
+                self._cancelled.discard(after_id)
+                continue
+            func(*args)
+
+    def destroy(self):
+        self._queue.clear()
+
+class FakeTextSink:
+    """Chat window replacement that only keeps the text"""
+
+    def __init__(self):
+        self.root = FakeRoot()
+        self.parts = []
+
+    def append_chat_segments(self, segments):
+        self.parts.extend(text for text, _ in segments)
+
+    def update_chat_window(self, message, tag=None):
+        self.parts.append(message)
+
+class CtkTextSink:
+    """A real CTkTextbox driven through GUIManager's own insert methods"""
+
+    append_chat_segments = GUIManager.append_chat_segments
+    update_chat_window = GUIManager.update_chat_window
+
+    def __init__(self):
+        import customtkinter as ctk
+        self.root = ctk.CTk()
+        self.root.geometry("800x600")
+        self.chat_window = ctk.CTkTextbox(self.root, state="disabled", wrap="word")
+        self.chat_window.pack(expand=True, fill="both")
+        self.root.update()
+
+SINKS = {"fake": FakeTextSink, "ctk": CtkTextSink}
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+class Scenario:
+    def __init__(self, sink_name, token_rate, reply_tokens, transcript_kb, buffered, replay_lines=None,
+                 capture=None, capture_mode="original", speed=1.0):
+        self.capture = capture
+        self.capture_mode = capture_mode
+        self.speed = speed
+        self.sink_name = sink_name
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.transcript_kb = transcript_kb
+        self.buffered = buffered
+        self.replay_lines = replay_lines
+        self.submitted = None
+        self.first_chunk = None
+        self.first_paint = None
+        self.completed = None
+        self.chunks = 0
+        self.render_times = []
+        self.ui_busy = 0.0
+        self.response_started = False
+
+    @property
+    def name(self):
+        mode = "buffered" if self.buffered else "direct"
+        if self.capture:
+            return f"{self.sink_name}-{mode}-capture-{self.capture_mode}"
+        rate = f"{self.token_rate:g}tps" if self.token_rate else "flood"
+        return f"{self.sink_name}-{mode}-{rate}"
+
+    def run(self):
+        server = None
+        if self.capture:
+            client = ReplayClient(self.capture, mode=self.capture_mode, speed=self.speed)
+        else:
+            reply = " ".join(f"tok{i}" for i in range(self.reply_tokens))
+            server = StubOllamaServer(token_rate=self.token_rate, reply=reply, replay_lines=self.replay_lines).start()
+            client = OllamaClient(api_base=server.api_base)
+        sink = SINKS[self.sink_name]()
+        root = sink.root
+        event_manager = EventManager()
+        event_manager.attach_main_loop(root)
+        chat_stream = ChatStreamBuffer(root, self._timed(sink.append_chat_segments))
+        # Keep the handler away from settings.json, ai_files and the response cache
+        workdir = tempfile.TemporaryDirectory(prefix="pip-pi-benchmark-")
+        handler = ChatbotHandler(event_manager, client=client, settings={
+            "response_cache": False,
+            "summary_cache": False,
+            "retrieval_enabled": False,
+            "ai_files_dir": str(Path(workdir.name) / "ai_files")
+        })
+        try:
+            self._subscribe(event_manager, chat_stream, sink, handler.ai_name)
+            if self.transcript_kb:
+                sink.append_chat_segments([(("x" * 79 + "\n") * (self.transcript_kb * 1024 // 80), None)])
+            chat_stream.start()
+            # Warm the connection and the stub "model" outside the measurement
+            handler.client.warm(handler.model_name)
+
+            self.submitted = time.perf_counter()
+            event_manager.publish("USER_INPUT_READY", "Benchmark prompt")
+            self._pump(root, chat_stream)
+        finally:
+            chat_stream.stop()
+            event_manager.shutdown()
+            handler.shutdown()
+            handler.client.close()
+            if server is not None:
+                server.stop()
+            root.destroy()
+            workdir.cleanup()
+        return self.report()
+
+    def _subscribe(self, event_manager, chat_stream, sink, ai_name):
+        # Same handlers MainApp registers, writing either through the buffer
+        # or straight to the widget for the unbuffered comparison.
+        write = chat_stream.write if self.buffered else self._timed_direct(sink)
+
+        def on_user_message(message):
+            write(f"You: {message}\n", "user")
+
+        def on_chunk(chunk):
+            if not self.response_started:
+                write(f"\n{ai_name}: ", "ai_name")
+                self.response_started = True
+            write(chunk)
+
+        def on_complete(_=None):
+            write("\n\n")
+            self.completed = time.perf_counter()
+
+        def on_chunk_received(_):
+            self.chunks += 1
+            if self.first_chunk is None:
+                self.first_chunk = time.perf_counter()
+
+        event_manager.subscribe("AI_RESPONSE_CHUNK", on_chunk_received)
+        event_manager.subscribe("DISPLAY_USER_MESSAGE", on_user_message, EventManager.MAIN_THREAD)
+        event_manager.subscribe("AI_RESPONSE_CHUNK", on_chunk, EventManager.MAIN_THREAD)
+        event_manager.subscribe("AI_RESPONSE_COMPLETE", on_complete, EventManager.MAIN_THREAD)
+
+    def _timed(self, render):
+        def timed_render(segments):
+            started = time.perf_counter()
+            render(segments)
+            finished = time.perf_counter()
+            self.render_times.append(finished - started)
+            if self.first_paint is None and self.first_chunk is not None:
+                self.first_paint = finished
+        return timed_render
+
+    def _timed_direct(self, sink):
+        timed = self._timed(lambda segments: sink.update_chat_window(*segments[0]))
+        return lambda text, tag=None: timed([(text, tag)])
+
+    def _pump(self, root, chat_stream):
+        deadline = time.perf_counter() + SCENARIO_TIMEOUT
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            root.update()
+            self.ui_busy += time.perf_counter() - started
+            if self.completed is not None:
+                chat_stream.flush()
+                return
+            time.sleep(0.001)
+        raise TimeoutError(f"Scenario {self.name} did not finish")
+
+    def report(self):
+        total_render = sum(self.render_times)
+        return {
+            "name": self.name,
+            "sink": self.sink_name,
+            "buffered": self.buffered,
+            "token_rate": self.token_rate,
+            "reply_tokens": self.reply_tokens,
+            "transcript_kb": self.transcript_kb,
+            "chunks": self.chunks,
+            "flushes": len(self.render_times),
+            "ttft_ms": ms(self.first_chunk - self.submitted) if self.first_chunk else None,
+            "first_paint_ms": ms(self.first_paint - self.submitted) if self.first_paint else None,
+            "total_ms": ms(self.completed - self.submitted) if self.completed else None,
+            "render_total_ms": ms(total_render),
+            "render_flush_mean_ms": ms(total_render / len(self.render_times)) if self.render_times else None,
+            "render_flush_p95_ms": ms(percentile(self.render_times, 0.95)),
+            "render_per_chunk_ms": ms(total_render / self.chunks) if self.chunks else None,
+            "ui_busy_ms": ms(self.ui_busy)
+        }
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {s["name"]: s for s in json.load(f)["scenarios"]}
+    keys = ["ttft_ms", "first_paint_ms", "render_per_chunk_ms", "ui_busy_ms"]
+    for scenario in results["scenarios"]:
+        before = baseline.get(scenario["name"])
+        if before is None:
+            continue
+        print(f"{scenario['name']}:")
+        for key in keys:
+            old, new = before.get(key), scenario.get(key)
+            if old and new is not None:
+                print(f"  {key:<22}{old:>10.2f} -> {new:>10.2f}  ({(new - old) / old * 100:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Pip-Pi's chat pipeline against a stub Ollama")
+    parser.add_argument("--sink", choices=sorted(SINKS), default="fake")
+    parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES,
+                        help="token rates to replay; 0 streams as fast as possible")
+    parser.add_argument("--tokens", type=int, default=DEFAULT_REPLY_TOKENS, help="tokens per reply")
+    parser.add_argument("--transcript-kb", type=int, default=DEFAULT_TRANSCRIPT_KB,
+                        help="existing chat text to preload, to mimic a long session")
+    parser.add_argument("--replay", help="recorded NDJSON stream to serve instead of a synthetic reply")
+    parser.add_argument("--capture", help="recorded capture to replay in place of the stub server")
+    parser.add_argument("--capture-mode", choices=REPLAY_MODES, default="original")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed-up for --capture-mode accelerated")
+    parser.add_argument("--direct", action="store_true", help="also run the unbuffered per-chunk path")
+    parser.add_argument("--output", help="where to save results (default: benchmark_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    replay_lines = None
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            replay_lines = [line for line in f if line.strip()]
+
+    modes = [True, False] if args.direct else [True]
+    rates = [0] if args.capture else args.rates
+    scenarios = []
+    for buffered in modes:
+        for rate in rates:
+            scenario = Scenario(args.sink, rate, args.tokens, args.transcript_kb, buffered, replay_lines,
+                                args.capture, args.capture_mode, args.speed)
+            result = scenario.run()
+            scenarios.append(result)
+            print(f"{result['name']:<28} ttft {result['ttft_ms']} ms, first paint {result['first_paint_ms']} ms, "
+                  f"render/chunk {result['render_per_chunk_ms']} ms, ui busy {result['ui_busy_ms']} ms")
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scenarios": scenarios
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
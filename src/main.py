@@ -1,14 +1,18 @@
 import sys
 import threading
-import subprocess
+import time
 from pathlib import Path
 from pygame import mixer
 
+from backend.conversation_store import CONVERSATION_DB_PATH, HISTORY_PAGE_SIZE
 from backend import (
     AnimationGifHandler,
     SystemMonitor,
     ThemeManager,
+    ChatStreamBuffer,
     ChatbotHandler,
+    ConversationStore,
+    EventManager,
     GUIManager,
     load_settings
 )
@@ -18,20 +22,8 @@ BASE_DIR = Path(__file__).parent
 PERSONALITIES_DIR = BASE_DIR / "personalities"
 SOUNDS_DIR = BASE_DIR / "sounds"
 THEMES_DIR = BASE_DIR / "themes"
-
-class EventManager:
-    def __init__(self):
-        self.subscribers = {}
-
-    def subscribe(self, event_type, handler):
-        if event_type not in self.subscribers:
-            self.subscribers[event_type] = []
-        self.subscribers[event_type].append(handler)
-
-    def publish(self, event_type, data=None):
-        if event_type in self.subscribers:
-            for handler in self.subscribers[event_type]:
-                handler(data)
+REPLY_STOP_TIMEOUT = 2.0
+REPLY_STOP_POLL_MS = 20
 
 class MainApp:
     def __init__(self):
@@ -40,9 +32,13 @@ class MainApp:
         self.theme_manager = ThemeManager()
         self.THEME = self._initialize_theme()
         self.gui = GUIManager(self, self.THEME)
+        self.event_manager.attach_main_loop(self.gui.root)
+        self.chat_stream = ChatStreamBuffer(self.gui.root, self.gui.append_chat_segments)
         self._initialize_components()
         self._setup_window()
         self._subscribe_events()
+        self._open_conversation_store()
+        self.chat_stream.start()
         self.play_startup_sound()
 
     def _initialize_theme(self):
@@ -72,6 +68,7 @@ class MainApp:
             event_manager=self.event_manager,
             animation_manager=self.animation_manager
         )
+        self.chatbot_handler.preload_model()
 
     def _setup_window(self):
         self.AI_NAME = self.chatbot_handler.ai_name
@@ -83,27 +80,235 @@ class MainApp:
             "DISPLAY_USER_MESSAGE": self._handle_user_message,
             "AI_THINKING_START": self._handle_thinking_start,
             "AI_RESPONSE_CHUNK": self._handle_response_chunk,
-            "AI_RESPONSE_COMPLETE": self._handle_response_complete
+            "AI_RESPONSE_COMPLETE": self._handle_response_complete,
+            "FACE_STATE_CHANGE": self.animation_manager.set_face_state,
+            "MODEL_LOADING": self._handle_model_loading,
+            "MODEL_READY": self._handle_model_ready,
+            "MODEL_LOAD_FAILED": self._handle_model_load_failed
         }
         for event, handler in event_mappings.items():
-            self.event_manager.subscribe(event, handler)
+            self.event_manager.subscribe(event, handler, EventManager.MAIN_THREAD)
+
+    def _open_conversation_store(self):
+        self.conversation_store = None
+        self.session_id = None
+        self.oldest_loaded_id = None
+        self.newest_loaded_id = None
+        self.showing_latest = True
+        self._search_query = None
+        settings = load_settings()
+        if not settings.get("persist_conversations", True):
+            return
+        try:
+            self.conversation_store = ConversationStore(settings.get("conversation_db_path", CONVERSATION_DB_PATH))
+        except Exception as e:
+            print(f"Error opening conversation store: {e}")
+            return
+        self.history_page_size = settings.get("history_page_size", HISTORY_PAGE_SIZE)
+        # Turns are only queued here; the store's writer thread does the disk work
+        self.event_manager.subscribe("CONVERSATION_TURN", self._handle_conversation_turn)
+        self.event_manager.subscribe("SEARCH_RESULTS", self._handle_search_results, EventManager.MAIN_THREAD)
+        session_id = self.conversation_store.latest_session()
+        if session_id is None:
+            session_id = self.conversation_store.create_session()
+        self.open_session(session_id)
+
+    def open_session(self, session_id, around_id=None):
+        """Switch to a saved conversation.
+
+        The model always continues from the newest page; the window shows that
+        page too, or the messages around around_id when jumping to a search hit.
+        """
+        # Let a reply that is still streaming finish into the session it belongs to
+        self._after_reply_stopped(lambda: self._switch_session(session_id, around_id))
+
+    def _switch_session(self, session_id, around_id):
+        self.event_manager.drain()
+        self.chat_stream.discard()
+        self._after_store_flushed(lambda: self._load_session(session_id, around_id))
+
+    def _load_session(self, session_id, around_id):
+        self.session_id = session_id
+        page = self.conversation_store.load_page(session_id, limit=self.history_page_size)
+        self.chatbot_handler.restore_history([(role, content) for _, role, content in page])
+        if around_id is None:
+            self._show_rows(page, at_latest=True)
+        else:
+            self.show_message(around_id)
+
+    def show_message(self, message_id):
+        """Show the current session around one message, highlighted"""
+        half_page = max(self.history_page_size // 2, 1)
+        rows = self.conversation_store.load_page(self.session_id, before_id=message_id + 1, limit=half_page)
+        rows += self.conversation_store.load_page(self.session_id, after_id=message_id, limit=half_page)
+        newer = rows and self.conversation_store.load_page(self.session_id, after_id=rows[-1][0], limit=1)
+        self._show_rows(rows, at_latest=not newer, highlight_id=message_id)
+        self.gui.show_search_hit()
+
+    def _show_latest(self, callback=None):
+        def show():
+            page = self.conversation_store.load_page(self.session_id, limit=self.history_page_size)
+            self._show_rows(page, at_latest=True)
+            if callback:
+                callback()
+        self._after_store_flushed(show)
+
+    def _show_rows(self, rows, at_latest, highlight_id=None):
+        self.oldest_loaded_id = rows[0][0] if rows else None
+        self.newest_loaded_id = rows[-1][0] if rows else None
+        # Live turns are only written below the newest page
+        self.showing_latest = at_latest
+        self.gui.clear_chat_window()
+        self.gui.append_chat_segments(self._history_segments(rows, highlight_id), scroll=highlight_id is None)
+
+    def on_new_chat(self):
+        if self.conversation_store is None:
+            self._after_reply_stopped(self._clear_chat)
+            return
+        self.open_session(self.conversation_store.create_session())
+
+    def _clear_chat(self):
+        self.chatbot_handler.restore_history([])
+        self.event_manager.drain()
+        self.chat_stream.discard()
+        self.gui.clear_chat_window()
+
+    def on_history_top(self):
+        if self.conversation_store is None or self.oldest_loaded_id is None:
+            return
+        page = self.conversation_store.load_page(
+            self.session_id,
+            before_id=self.oldest_loaded_id,
+            limit=self.history_page_size
+        )
+        if not page:
+            # Nothing older exists; stop querying on every scroll
+            self.oldest_loaded_id = None
+            return
+        self.oldest_loaded_id = page[0][0]
+        self.gui.prepend_chat_segments(self._history_segments(page))
+
+    def on_history_bottom(self):
+        if self.conversation_store is None or self.showing_latest or self.newest_loaded_id is None:
+            return
+        page = self.conversation_store.load_page(
+            self.session_id,
+            after_id=self.newest_loaded_id,
+            limit=self.history_page_size
+        )
+        if len(page) < self.history_page_size:
+            self.showing_latest = True
+        if page:
+            self.newest_loaded_id = page[-1][0]
+            self.gui.append_chat_segments(self._history_segments(page), scroll=False)
+
+    def on_search(self, query):
+        if self.conversation_store is None:
+            return
+        self._search_query = query
+        # Ranking very common words can take a while; keep it off the Tk thread
+        threading.Thread(target=self._run_search, args=(query,), daemon=True).start()
+
+    def _run_search(self, query):
+        self.event_manager.publish("SEARCH_RESULTS", (query, self.conversation_store.search(query)))
+
+    def _handle_search_results(self, data):
+        query, results = data
+        if query == self._search_query:
+            self.gui.show_search_results(results, self.AI_NAME)
+
+    def on_search_result_selected(self, result):
+        if result["session_id"] != self.session_id:
+            self.open_session(result["session_id"], around_id=result["message_id"])
+            return
+        # Leaving the newest page would strand a reply that is still streaming
+        self._after_reply_stopped(lambda: self._jump_to_message(result["message_id"]))
+
+    def on_personality_select(self, personality_name):
+        # A reply still streaming must record its partial text before the history moves over
+        self._after_reply_stopped(lambda: self.chatbot_handler.switch_personality(personality_name))
+
+    def _jump_to_message(self, message_id):
+        self.event_manager.drain()
+        self.chat_stream.discard()
+        self._after_store_flushed(lambda: self.show_message(message_id))
+
+    def _after_store_flushed(self, callback):
+        """Run callback on the Tk thread once every queued turn has been committed.
+
+        The flush waits for the writer's next commit, so it runs on a
+        worker thread and is polled for with after(), like a stopping reply.
+        """
+        flushed = threading.Event()
+
+        def flush():
+            self.conversation_store.flush()
+            flushed.set()
+        threading.Thread(target=flush, daemon=True).start()
+
+        def check():
+            if flushed.is_set():
+                callback()
+            else:
+                self.gui.root.after(REPLY_STOP_POLL_MS, check)
+        check()
+
+    def _after_reply_stopped(self, callback):
+        """Cancel a streaming reply and run callback once it has recorded its partial text.
+
+        Polls with after() rather than waiting, so the Tk thread never blocks.
+        """
+        handle = self.chatbot_handler.current_generation
+        self.chatbot_handler.cancel_generation()
+        deadline = time.monotonic() + REPLY_STOP_TIMEOUT
+
+        def check():
+            if handle is None or handle.done.is_set() or time.monotonic() >= deadline:
+                callback()
+            else:
+                self.gui.root.after(REPLY_STOP_POLL_MS, check)
+        check()
+
+    def _history_segments(self, rows, highlight_id=None):
+        """Render saved turns the same way live ones are written"""
+        segments = []
+        for message_id, role, content in rows:
+            hit = ("search_hit",) if message_id == highlight_id else ()
+            if role == "User":
+                segments.append((f"You: {content}\n", ("user", *hit)))
+            else:
+                segments.extend([(f"\n{self.AI_NAME}: ", "ai_name"), (content, hit or None), ("\n\n", None)])
+        return segments
+
+    def _handle_conversation_turn(self, turn):
+        if self.session_id is not None:
+            self.conversation_store.append(self.session_id, turn["role"], turn["content"], turn["personality"])
 
     def _handle_user_message(self, message):
-        self.gui.update_chat_window(f"You: {message}\n", "user")
+        self.chat_stream.write(f"You: {message}\n", "user")
 
     def _handle_thinking_start(self, _=None):
         pass
 
     def _handle_response_chunk(self, chunk):
         if not hasattr(self, '_response_started'):
-            self.gui.update_chat_window(f"\n{self.AI_NAME}: ", "ai_name")
+            self.chat_stream.write(f"\n{self.AI_NAME}: ", "ai_name")
             self._response_started = True
-        self.gui.update_chat_window(chunk)
+        self.chat_stream.write(chunk)
 
     def _handle_response_complete(self, _=None):
-        self.gui.update_chat_window("\n\n")
+        self.chat_stream.write("\n\n")
         delattr(self, '_response_started')
 
+    def _handle_model_loading(self, model_name):
+        self.gui.show_model_status(f"Loading {model_name}...")
+
+    def _handle_model_ready(self, _=None):
+        self.gui.show_model_status("")
+
+    def _handle_model_load_failed(self, model_name):
+        self.gui.show_model_status(f"Could not load {model_name}")
+
     def play_startup_sound(self):
         try:
             settings = load_settings()
@@ -121,7 +326,21 @@ class MainApp:
         user_input = self.gui.get_user_input()
         if user_input:
             self.gui.clear_input_field()
-            self.event_manager.publish("USER_INPUT_READY", user_input)
+            def submit():
+                self.event_manager.publish("USER_INPUT_READY", user_input)
+            if self.conversation_store is not None and not self.showing_latest:
+                # Send once the newest page is shown, so the new turn lands below it
+                self._show_latest(submit)
+            else:
+                submit()
+
+    def on_input_activity(self, _=None):
+        if hasattr(self, 'chatbot_handler'):
+            self.chatbot_handler.prefetch_model()
+
+    def on_stop(self):
+        if hasattr(self, 'chatbot_handler'):
+            self.chatbot_handler.cancel_generation()
 
     def apply_theme(self, theme_name):
         self.THEME = self.theme_manager.load_theme(theme_name)
@@ -142,7 +361,10 @@ class MainApp:
 
     def on_close(self):
         self._stop_model()
+        self._close_conversation_store()
         self._cleanup_callbacks()
+        self.chat_stream.stop()
+        self.event_manager.shutdown()
         if hasattr(self, 'animation_manager'):
             self.animation_manager.stop_all_animations()
         if hasattr(self, 'system_monitor'):
@@ -153,11 +375,21 @@ class MainApp:
         sys.exit(0)
 
     def _stop_model(self):
+        if not hasattr(self, 'chatbot_handler'):
+            return
         try:
-            subprocess.run(["ollama", "stop"], check=True)
+            self.chatbot_handler.shutdown()
         except Exception as e:
             print(f"Error stopping model: {e}")
 
+    def _close_conversation_store(self):
+        if getattr(self, 'conversation_store', None) is None:
+            return
+        try:
+            self.conversation_store.close()
+        except Exception as e:
+            print(f"Error closing conversation store: {e}")
+
     def _cleanup_callbacks(self):
         for key, after_id in list(self.after_ids.items()):
             try: